@@ -1,13 +1,33 @@
-from fastapi import APIRouter
+import json
+from typing import List
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.qa_service import get_response
+from app.config.setting import BATCH_MAX_QUESTIONS
+from app.services.qa_service import get_response, get_batch_responses
 
 router = APIRouter()
 
 class QueryRequest(BaseModel):
     question: str
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+
 @router.post("/query")
 def handle_query(request: QueryRequest):
     response = get_response(request.question)
-    return {"answer": response}
\ No newline at end of file
+    return {"answer": response}
+
+@router.post("/query/batch")
+def handle_batch_query(request: BatchQueryRequest):
+    """Answers a list of questions, streaming one NDJSON line per answer as it completes."""
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+
+    results = get_batch_responses(request.questions)
+    lines = (json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
@@ -6,4 +6,40 @@ load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-VECTOR_STORE_PATH = "Database"
\ No newline at end of file
+VECTOR_STORE_PATH = "Database"
+
+# Embeddings for the vector store; "google" (API) or "local" (sentence-transformers, offline)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "google").lower()
+GOOGLE_EMBEDDING_MODEL = os.getenv("GOOGLE_EMBEDDING_MODEL", "models/embedding-001")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", 64))
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", os.cpu_count() or 1))  # Encoding workers during ingestion
+
+# Prompt budget for the RAG chain (approximate Gemini tokens)
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", 8))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 800))  # Max retrieved context per prompt, under four 1000-character chunks
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 600))
+
+# Observability
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Language model gateway
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # e.g. http://127.0.0.1:8765 for a local fake server
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))  # In-flight requests per model
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))  # Deadline per call, including retries
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 8))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))  # Consecutive failures before opening
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", 0.95))  # Hedge calls slower than this latency quantile
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))  # Calls observed before hedging starts
+
+# Batch questions (/api/query/batch)
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 500))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))  # Generations in flight per batch
+BATCH_GROUP_SIZE = int(os.getenv("BATCH_GROUP_SIZE", 5))  # Questions with the same best chunk answered in one call
+BATCH_GROUP_TOKEN_BUDGET = int(os.getenv("BATCH_GROUP_TOKEN_BUDGET", 1600))  # Shared context of a group of questions
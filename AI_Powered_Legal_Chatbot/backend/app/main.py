@@ -1,6 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import logging
+from app.utils.metrics import configure_logging, setup_observability
+
+# Configure structured logging before the services log during import
+configure_logging()
+logger = logging.getLogger(__name__)
+
 from app.api.routes import router
 
 app = FastAPI()
@@ -14,9 +21,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request IDs, timings and Prometheus /metrics
+setup_observability(app)
+
 # Error handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
+    logger.error(f"Unhandled error on {request.url.path}: {exc}", exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"message": str(exc)}
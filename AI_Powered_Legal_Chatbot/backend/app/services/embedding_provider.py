@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+from typing import List
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from app.config.setting import (
+    EMBEDDING_PROVIDER, GOOGLE_EMBEDDING_MODEL, LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_BATCH_SIZE,
+)
+from app.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("google", "local")
+
+# Written next to the FAISS files so a store is only ever queried with the embeddings it was built with
+INDEX_META_FILE = "index_meta.json"
+
+# Stores built before the metadata file existed all used the Google embeddings
+LEGACY_INDEX_META = {"provider": "google", "model": "models/embedding-001"}
+
+
+class IndexMetadataError(Exception):
+    """The vector store was built with a different embedding provider, model or dimension."""
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    sentence-transformers model run in-process: no API key, quota or network once
+    the model is in the local Hugging Face cache. Vectors are L2-normalized, so the
+    store's L2 distance ranks like cosine similarity.
+    """
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE):
+        # Optional dependency: only needed when EMBEDDING_PROVIDER=local
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True),
+            dtype=np.float32,
+        )
+
+    def encode_multi_process(self, texts: List[str], processes: int) -> np.ndarray:
+        """Encode a large corpus with one worker process per CPU core."""
+        if processes <= 1:
+            return self.encode(texts)
+        pool = self.model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        try:
+            vectors = self.model.encode_multi_process(
+                texts, pool, batch_size=self.batch_size, normalize_embeddings=True,
+            )
+        finally:
+            self.model.stop_multi_process_pool(pool)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        with timed("embed_query"):
+            return self.encode([text])[0].tolist()
+
+
+def get_embeddings(provider: str = EMBEDDING_PROVIDER) -> Embeddings:
+    """The embedding model selected by EMBEDDING_PROVIDER."""
+    if provider == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(model=GOOGLE_EMBEDDING_MODEL)
+    if provider == "local":
+        return LocalEmbeddings()
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER {provider!r}; expected one of {', '.join(PROVIDERS)}")
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> np.ndarray:
+    """Embed several queries in one call. Google embeds queries and documents differently."""
+    if isinstance(embeddings, LocalEmbeddings):
+        return embeddings.encode(texts)
+    return np.asarray(embeddings.embed_documents(texts, task_type="retrieval_query"), dtype=np.float32)
+
+
+def embedding_meta(embeddings: Embeddings, dimension: int) -> dict:
+    if isinstance(embeddings, LocalEmbeddings):
+        return {"provider": "local", "model": embeddings.model_name, "dimension": dimension}
+    return {"provider": "google", "model": embeddings.model, "dimension": dimension}
+
+
+def save_vector_store(vector_store: FAISS, path: str, embeddings: Embeddings):
+    """Save the FAISS files and the metadata describing the embeddings they hold."""
+    os.makedirs(path, exist_ok=True)
+    vector_store.save_local(path)
+    with open(os.path.join(path, INDEX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(embedding_meta(embeddings, vector_store.index.d), f, indent=2)
+
+
+def load_vector_store(path: str, embeddings: Embeddings) -> FAISS:
+    """Load a saved store, refusing one built with other embeddings than `embeddings`."""
+    meta_path = os.path.join(path, INDEX_META_FILE)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"No {INDEX_META_FILE} in '{path}'; assuming it was built with {LEGACY_INDEX_META}")
+        stored = LEGACY_INDEX_META
+
+    vector_store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    expected = embedding_meta(embeddings, vector_store.index.d)
+    if isinstance(embeddings, LocalEmbeddings):
+        expected["dimension"] = embeddings.dimension
+    mismatched = [key for key in ("provider", "model", "dimension") if key in stored and stored[key] != expected[key]]
+    if mismatched:
+        raise IndexMetadataError(
+            f"The vector store in '{path}' was built with {stored}, but the configured embeddings are "
+            f"{expected}. Re-run ingestion.py or set EMBEDDING_PROVIDER to match."
+        )
+    logger.info(f"Loaded vector store '{path}': {vector_store.index.ntotal} vectors, {expected}")
+    return vector_store
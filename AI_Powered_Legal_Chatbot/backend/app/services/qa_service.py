@@ -1,27 +1,99 @@
 from langchain_community.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.prompts import PromptTemplate
 from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory  # Updated import for memory
 from langchain_community.chat_models import ChatGooglePalm  # Import for Gemini
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
 import os
+import re
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional
+
+import faiss
+import numpy as np
 from dotenv import load_dotenv
 
 from langchain_google_genai import ChatGoogleGenerativeAI  # Change this import
-import google.generativeai as genai  # Add this import
 
+from app.config.setting import (
+    RETRIEVAL_FETCH_K, CONTEXT_TOKEN_BUDGET, HISTORY_TOKEN_BUDGET, GEMINI_MODEL, GEMINI_API_ENDPOINT,
+    BATCH_CONCURRENCY, BATCH_GROUP_SIZE, BATCH_GROUP_TOKEN_BUDGET, VECTOR_STORE_PATH,
+)
+from app.utils.context_builder import build_context, estimate_tokens
+from app.utils.metrics import timed, increment
+from app.services.llm_gateway import gateway, LLMGateway
+from app.services.embedding_provider import get_embeddings, load_vector_store, embed_queries
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 google_api_key = os.getenv("GOOGLE_API_KEY")  # Ensure this is set in your .env file
 
-# Configure Google Generative AI
-genai.configure(api_key=google_api_key)
+
+class BudgetedRetriever(BaseRetriever):
+    """
+    Similarity retriever that packs its hits into a token budget.
+    Over-fetches candidates, drops duplicate and overlapping chunks and trims the
+    rest to `token_budget`; each returned document records its token cost.
+    """
+    vector_store: FAISS
+    fetch_k: int = RETRIEVAL_FETCH_K
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        with timed("similarity_search"):
+            docs = self.vector_store.similarity_search(query, k=self.fetch_k)
+        return pack_documents(docs, self.token_budget)
+
+
+def pack_documents(docs: List[Document], token_budget: int = CONTEXT_TOKEN_BUDGET) -> List[Document]:
+    """Deduplicate and trim retrieved documents to `token_budget`, recording each one's token cost."""
+    with timed("build_context"):
+        packed = build_context([doc.page_content for doc in docs], token_budget)
+    return [
+        Document(
+            page_content=text,
+            metadata={**docs[index].metadata, "tokens": estimate_tokens(text)},
+        )
+        for index, text in zip(packed["indices"], packed["chunks"])
+    ]
+
+
+class GatewayChatModel(BaseChatModel):
+    """
+    Routes every generation of the wrapped chat model through the LLM gateway, so
+    chain calls share its concurrency limit, deadline, retries and circuit breaker.
+    Hedging is safe here: the chain writes memory once, after the call returns.
+    """
+    llm: BaseChatModel
+    model_name: str = GEMINI_MODEL
+    llm_gateway: LLMGateway = gateway
+
+    @property
+    def _llm_type(self) -> str:
+        return f"gateway-{self.llm._llm_type}"
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        prompt_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        return self.llm_gateway.call(
+            self.model_name, self.llm._generate, messages, stop=stop,
+            prompt_tokens=prompt_tokens, **kwargs,
+        )
+
 
 # Initialize embeddings and vector store
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-vector_store = FAISS.load_local("Database", embeddings, allow_dangerous_deserialization=True)
-retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 4})
+embeddings = get_embeddings()
+vector_store = load_vector_store(VECTOR_STORE_PATH, embeddings)
+retriever = BudgetedRetriever(vector_store=vector_store)
 
 # Define the prompt template
 prompt_template = """
@@ -35,15 +107,22 @@ ANSWER:
 prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question", "chat_history"])
 
 # Initialize the LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-pro",
-    temperature=0.7,
-    google_api_key=google_api_key
+llm = GatewayChatModel(
+    llm=ChatGoogleGenerativeAI(
+        model=GEMINI_MODEL,
+        temperature=0.7,
+        google_api_key=google_api_key,
+        # Retries are the gateway's job; the timeout bounds abandoned attempts
+        max_retries=0,
+        timeout=gateway.timeout,
+        **({"transport": "rest", "client_options": {"api_endpoint": GEMINI_API_ENDPOINT}} if GEMINI_API_ENDPOINT else {}),
+    ),
 )
 
 # Initialize the memory using ConversationBufferMemory
 memory = ConversationBufferMemory(
     memory_key="chat_history",
+    output_key="answer",
     return_messages=True
 )
 
@@ -52,9 +131,22 @@ qa_chain = ConversationalRetrievalChain.from_llm(
     llm=llm,
     retriever=retriever,
     memory=memory,
+    return_source_documents=True,
     combine_docs_chain_kwargs={"prompt": prompt}
 )
 
+
+def _history_tokens() -> int:
+    return sum(estimate_tokens(message.content) for message in memory.chat_memory.messages)
+
+
+def trim_chat_history(token_budget: int = HISTORY_TOKEN_BUDGET):
+    """Drop the oldest question/answer pairs until the chat history fits the budget."""
+    messages = memory.chat_memory.messages
+    while messages and _history_tokens() > token_budget:
+        del messages[:2]
+
+
 def get_response(question: str) -> str:
     """
     Handles the retrieval-augmented generation (RAG) process for the chatbot.
@@ -63,5 +155,126 @@ def get_response(question: str) -> str:
     Returns:
         str: The chatbot's response.
     """
-    result = qa_chain.invoke({"question": question})
-    return result["answer"]
\ No newline at end of file
+    trim_chat_history()
+    history_tokens = _history_tokens()
+
+    with timed("qa_chain_invoke"):
+        result = qa_chain.invoke({"question": question})
+
+    context_tokens = sum(doc.metadata.get("tokens", 0) for doc in result.get("source_documents", []))
+    prompt_tokens = estimate_tokens(prompt_template) + context_tokens + history_tokens + estimate_tokens(question)
+    logger.info(
+        "Prompt tokens: %d (context=%d, history=%d, chunks=%d)",
+        prompt_tokens, context_tokens, history_tokens, len(result.get("source_documents", [])),
+    )
+    return result["answer"]
+
+# Batch questions are answered outside the chain, so they never read or write the chat history
+batch_prompt_template = """
+<s>[INST]As a legal chat bot, answer each of the numbered questions below accurately and concisely, based on the context, exactly as you would answer it on its own. Do not generate your own questions. If a question falls outside the given context, rely on your own knowledge base. Reply with JSON only, one answer per question and in the same order: {{"answers": ["answer to question 1", "answer to question 2"]}}
+CONTEXT: {context}
+QUESTIONS:
+{questions}
+ANSWERS:
+</s>[INST]
+"""
+batch_prompt = PromptTemplate(template=batch_prompt_template, input_variables=["context", "questions"])
+
+_JSON_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def retrieve_batch(questions: List[str]) -> np.ndarray:
+    """
+    Vector store rows of the RETRIEVAL_FETCH_K nearest chunks of every question,
+    from one batched embedding call and one multi-query FAISS search instead of a
+    round trip and a search per question.
+    """
+    with timed("embed_questions"):
+        vectors = embed_queries(embeddings, questions)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(vectors)
+    with timed("similarity_search"):
+        _, rows = vector_store.index.search(vectors, RETRIEVAL_FETCH_K)
+    return rows
+
+
+def group_questions(rows: np.ndarray) -> List[List[int]]:
+    """Indices of questions grouped by their best-matching chunk, at most BATCH_GROUP_SIZE to a group."""
+    open_groups = {}
+    groups = []
+    for index, hits in enumerate(rows):
+        group = open_groups.get(hits[0])
+        if group is None or len(group) >= BATCH_GROUP_SIZE:
+            group = open_groups[hits[0]] = []
+            groups.append(group)
+        group.append(index)
+    return groups
+
+
+def group_context(rows: np.ndarray) -> List[Document]:
+    """
+    Shared context for a group of questions: their hits interleaved by rank, so each
+    question keeps its best chunks, packed into BATCH_GROUP_TOKEN_BUDGET. A single
+    question gets exactly the context /query would give it.
+    """
+    ranked = dict.fromkeys(row for rank in rows.T for row in rank if row != -1)
+    docs = [vector_store.docstore.search(vector_store.index_to_docstore_id[row]) for row in ranked]
+    return pack_documents(docs, CONTEXT_TOKEN_BUDGET if len(rows) == 1 else BATCH_GROUP_TOKEN_BUDGET)
+
+
+def answer_group(questions: List[str], rows: np.ndarray) -> List[str]:
+    """Answer a group of questions from their shared context, in one model call when there are several."""
+    context = "\n\n".join(doc.page_content for doc in group_context(rows))
+    if len(questions) > 1:
+        numbered = "\n".join(f"{number}. {question}" for number, question in enumerate(questions, 1))
+        reply = llm.invoke(batch_prompt.format(context=context, questions=numbered)).content
+        try:
+            answers = json.loads(_JSON_FENCE_RE.sub("", reply.strip()))["answers"]
+            if isinstance(answers, list) and len(answers) == len(questions):
+                return [str(answer) for answer in answers]
+        except (ValueError, KeyError, TypeError):
+            pass
+        logger.warning(f"Unusable answer for {len(questions)} grouped questions; answering them one by one")
+        increment("batch_group_fallback")
+
+    return [llm.invoke(prompt.format(context=context, chat_history="", question=question)).content
+            for question in questions]
+
+
+def get_batch_responses(questions: List[str]) -> Iterator[dict]:
+    """
+    Answers many questions at once, without the chat history. Retrieval runs up
+    front for the whole batch; the returned iterator then yields
+    {"index", "question", "answer"} (or "error") for each question as its group's
+    generation completes, with at most BATCH_CONCURRENCY generations in flight.
+    """
+    rows = retrieve_batch(questions)
+    groups = group_questions(rows)
+    increment("batch_questions", len(questions))
+    increment("batch_generations", len(groups))
+    logger.info(f"Batch of {len(questions)} questions answered in {len(groups)} groups")
+    return _stream_batch(questions, rows, groups)
+
+
+def _stream_batch(questions: List[str], rows: np.ndarray, groups: List[List[int]]) -> Iterator[dict]:
+    executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch")
+    try:
+        futures = {}
+        for indices in groups:
+            unique = list(dict.fromkeys(questions[index] for index in indices))
+            futures[executor.submit(answer_group, unique, rows[indices])] = (indices, unique)
+
+        for future in as_completed(futures):
+            indices, unique = futures[future]
+            try:
+                answers = dict(zip(unique, future.result()))
+            except Exception as e:
+                logger.error(f"Error answering batch questions {indices}: {e}")
+                for index in indices:
+                    yield {"index": index, "question": questions[index], "error": str(e)}
+                continue
+            for index in indices:
+                yield {"index": index, "question": questions[index], "answer": answers[questions[index]]}
+    finally:
+        # Also runs when the client disconnects: drop the generations not started yet
+        executor.shutdown(wait=False, cancel_futures=True)
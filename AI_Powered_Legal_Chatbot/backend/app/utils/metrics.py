@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from functools import wraps
+
+from fastapi import FastAPI, Request, Response
+
+from app.config.setting import METRICS_ENABLED, LOG_LEVEL
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+except ImportError:  # prometheus-client is optional; without it timings are skipped
+    Histogram = None
+
+METRICS_NAMESPACE = "chatbot"
+ENABLED = METRICS_ENABLED and Histogram is not None
+
+# Covers sub-millisecond FAISS searches up to slow multi-turn generations
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+logger = logging.getLogger(__name__)
+
+if ENABLED:
+    STAGE_LATENCY = Histogram(
+        "stage_duration_seconds", "Time spent in an instrumented stage.",
+        ["stage"], namespace=METRICS_NAMESPACE, buckets=LATENCY_BUCKETS,
+    )
+    STAGE_ERRORS = Counter(
+        "stage_errors_total", "Instrumented stages that raised.",
+        ["stage"], namespace=METRICS_NAMESPACE,
+    )
+    EVENTS = Counter(
+        "events_total", "Notable events such as cache hits.",
+        ["event"], namespace=METRICS_NAMESPACE,
+    )
+    LLM_TOKENS = Counter(
+        "llm_tokens_total", "Tokens sent to and generated by language models.",
+        ["model", "kind"], namespace=METRICS_NAMESPACE,
+    )
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds", "HTTP request latency.",
+        ["method", "route", "status"], namespace=METRICS_NAMESPACE, buckets=LATENCY_BUCKETS,
+    )
+
+
+# --- Timers ---
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_LATENCY.labels(self.stage).observe(time.perf_counter() - self.start)
+        if exc_type is not None:
+            STAGE_ERRORS.labels(self.stage).inc()
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage: str):
+    """Context manager recording the duration of a block under `stage`."""
+    return _StageTimer(stage) if ENABLED else _NULL_TIMER
+
+
+def instrument(stage: str):
+    """Decorator recording every call of the wrapped function under `stage`."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _StageTimer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(event: str, amount: int = 1):
+    """Count an event such as a cache hit."""
+    if ENABLED:
+        EVENTS.labels(event).inc(amount)
+
+
+def count_tokens(model: str, kind: str, amount: int):
+    """Add to the prompt or completion token total of `model`."""
+    if ENABLED and amount > 0:
+        LLM_TOKENS.labels(model, kind).inc(amount)
+
+
+# --- Logging ---
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, tagged with the current request ID."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": request_id_var.get(),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """Send all log records to stderr as structured JSON."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+
+
+# --- FastAPI wiring ---
+
+def setup_observability(app: FastAPI):
+    """Add request IDs, request timing and the Prometheus /metrics endpoint."""
+
+    @app.middleware("http")
+    async def request_context(request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            if ENABLED:
+                route = request.scope.get("route")
+                REQUEST_LATENCY.labels(
+                    request.method, route.path if route else "unmatched", str(status)
+                ).observe(elapsed)
+            logger.info("%s %s -> %d in %.1f ms", request.method, request.url.path, status, elapsed * 1000)
+            request_id_var.reset(token)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        if not ENABLED:
+            return Response("Metrics are disabled.\n", status_code=404, media_type="text/plain")
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,203 @@
+import re
+from bisect import bisect_right
+from typing import Iterable, Iterator, List
+
+# Headings that open a new unit of a statute or judgment, at the start of a line:
+# "CHAPTER XVI", "Section 302", "Article 21", or the bare "302. Punishment for ..."
+# style used by the bare acts (and by numbered paragraphs in judgments). Patterns
+# lead with a literal newline, which lets the regex engine skip ahead quickly; the
+# cut position is the character after it.
+HEADING_RE = re.compile(
+    r"\n[ \t]*(?:"
+    r"(?P<chapter>(?:CHAPTER|Chapter)\s+[IVXLCDM\d]+[A-Z]?)\b"
+    r"|(?:SECTION|Section|Sec\.)\s+(?P<section>\d+[A-Z]{0,3})\b"
+    r"|(?:ARTICLE|Article|Art\.)\s+(?P<article>\d+[A-Z]{0,3})\b"
+    r"|(?P<numbered>\d{1,3}[A-Z]{0,3})\.[ \t]+(?=[A-Z\[(\"'])"
+    r")"
+)
+
+# Block-level breaks: a line opening a clause such as "(a)", "(ii)" or "(3)", or a
+# blank line. The cut position is the end of the match.
+BLOCK_RE = re.compile(r"\n(?=[ \t]*\((?:[a-z]{1,4}|\d{1,3}|[A-Z])\)[ \t])|\n[ \t]*\n")
+
+# Finer breaks, best first, searched only when a chunk has no structural break.
+# Each entry: (pattern, cut at match end?)
+SENTENCE_RE = re.compile(r"[.;:?!](?=\s)")
+LINE_RE = re.compile(r"\n")
+SPACE_RE = re.compile(r"\s")
+FALLBACK_BREAKS = (
+    (SENTENCE_RE, True),
+    (LINE_RE, True),
+    (SPACE_RE, False),
+)
+LEADING_SPACE_RE = re.compile(r"\s*")
+
+# Enough trailing text to recognise a heading that starts at a given position
+HEADING_LOOKAHEAD = 64
+
+# Fallback breaks are searched backwards from the size limit in growing windows
+TAIL_WINDOWS = (128, 512)
+
+
+def _last_match(pattern: re.Pattern, text: str, lo: int, hi: int, at_end: bool) -> int:
+    """Position of the last break produced by `pattern` in (lo, hi], or -1."""
+    segment_hi = hi
+    for width in TAIL_WINDOWS + (None,):
+        segment_lo = lo if width is None else max(lo, segment_hi - width)
+        cut = -1
+        # One extra character so lookaheads at the segment edge can match
+        for match in pattern.finditer(text, segment_lo, segment_hi + 1):
+            position = match.end() if at_end else match.start()
+            if segment_lo < position <= segment_hi:
+                cut = position
+        if cut > 0 or segment_lo <= lo:
+            return cut
+        segment_hi = segment_lo
+    return -1
+
+
+def _last_before(positions: list, lo: int, hi: int) -> int:
+    """Largest entry of sorted `positions` in (lo, hi], or -1."""
+    index = bisect_right(positions, hi) - 1
+    return positions[index] if index >= 0 and positions[index] > lo else -1
+
+
+class LegalTextSplitter:
+    """
+    Streaming splitter that prefers to cut statutes and judgments at their own
+    structure: chapter and section/article headings first, then clauses and
+    paragraphs, then sentences, lines and finally whitespace.
+
+    Each page is scanned once for headings and block breaks as it arrives and only
+    about two chunks of text are buffered. Chunks never exceed `chunk_size`
+    characters; consecutive chunks share up to `chunk_overlap` characters, except
+    across a chapter or section boundary where the new unit starts clean. Offsets
+    refer to the pages joined with "\\n".
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, min_chunk_ratio: float = 0.5):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size}).")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # A break is only taken if it leaves a chunk at least this long
+        self.min_chunk_size = max(1, int(chunk_size * min_chunk_ratio))
+
+    def split_text(self, text: str) -> List[str]:
+        """Split a whole document into chunk strings (LangChain-compatible)."""
+        return [chunk["text"] for chunk in self.iter_chunks([text])]
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[dict]:
+        """
+        Yield chunks as dicts with `text`, `start`, `end`, `page` (1-based), and the
+        `chapter` and `section` in force where the chunk starts.
+        """
+        # All positions below are offsets into the joined document. The buffer starts
+        # with a newline so a heading on the first line matches like any other.
+        buffer = "\n"
+        base = -1  # Offset of buffer[0]
+        position = 0  # Start of the next chunk
+        page_offsets = []
+        page_numbers = []
+
+        heading_cuts = []  # Line starts of every heading
+        heading_labels = []  # (chapter, section) set by the heading at the same index
+        chapter_cuts = []
+        block_cuts = []
+        next_heading = 0
+        chapter = section = None
+
+        lookahead = self.chunk_size + HEADING_LOOKAHEAD
+        pages = iter(pages)
+        exhausted = False
+
+        while True:
+            # Keep enough text buffered to place the next cut
+            while not exhausted and base + len(buffer) - position <= lookahead:
+                page = next(pages, None)
+                if page is None:
+                    exhausted = True
+                    break
+                if page_offsets:
+                    buffer += "\n"
+                page_start = base + len(buffer)
+                page_offsets.append(page_start)
+                page_numbers.append(len(page_numbers) + 1)
+
+                scan_from = len(buffer) - 1
+                buffer += page
+                for match in HEADING_RE.finditer(buffer, scan_from):
+                    heading_cuts.append(base + match.start() + 1)
+                    if match.group("chapter"):
+                        chapter_cuts.append(heading_cuts[-1])
+                        heading_labels.append((" ".join(match.group("chapter").split()).upper(), None))
+                    elif match.group("section"):
+                        heading_labels.append((None, f"Section {match.group('section')}"))
+                    elif match.group("article"):
+                        heading_labels.append((None, f"Article {match.group('article')}"))
+                    else:
+                        heading_labels.append((None, match.group("numbered")))
+                block_cuts.extend(base + match.end() for match in BLOCK_RE.finditer(buffer, scan_from))
+
+            # Drop consumed text so memory stays bounded by the chunk size
+            if position - base > lookahead:
+                buffer = buffer[position - base:]
+                base = position
+
+            start = base + LEADING_SPACE_RE.match(buffer, position - base).end()
+            end_of_text = base + len(buffer)
+            if start >= end_of_text:
+                if exhausted:
+                    return
+                position = start
+                continue
+
+            # Bring chapter/section state up to the start of this chunk
+            while next_heading < len(heading_cuts) and heading_cuts[next_heading] <= start:
+                label_chapter, label_section = heading_labels[next_heading]
+                if label_chapter:
+                    chapter, section = label_chapter, None
+                else:
+                    section = label_section
+                next_heading += 1
+
+            limit = start + self.chunk_size
+            if exhausted and limit >= end_of_text:
+                end, structural = end_of_text, True
+            else:
+                end, structural = self._find_cut(buffer, base, start, min(limit, end_of_text),
+                                                 heading_cuts, chapter_cuts, block_cuts)
+
+            text = buffer[start - base:end - base].rstrip()
+            page_index = bisect_right(page_offsets, start) - 1
+            yield {
+                "text": text,
+                "start": start,
+                "end": start + len(text),
+                "page": page_numbers[max(page_index, 0)],
+                "chapter": chapter,
+                "section": section,
+            }
+
+            if structural or end - start <= self.chunk_overlap:
+                position = end
+            else:
+                # Back up by the overlap, then forward to a word boundary
+                overlap_start = max(end - self.chunk_overlap, start + 1)
+                space = SPACE_RE.search(buffer, overlap_start - base, end - base)
+                position = base + space.end() if space else end
+
+    def _find_cut(self, buffer: str, base: int, start: int, limit: int,
+                  heading_cuts: list, chapter_cuts: list, block_cuts: list):
+        """Return (cut offset, whether the cut opens a new chapter or section)."""
+        lo = start + self.min_chunk_size
+        for cuts, structural in ((chapter_cuts, True), (heading_cuts, True), (block_cuts, False)):
+            cut = _last_before(cuts, lo, limit)
+            if cut > 0:
+                return cut, structural
+
+        for pattern, at_end in FALLBACK_BREAKS:
+            cut = _last_match(pattern, buffer, lo - base, limit - base, at_end)
+            if cut > 0:
+                return base + cut, False
+        return limit, False
@@ -1,11 +1,13 @@
 import os
 import logging
 from tqdm import tqdm
+from pypdf import PdfReader
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 from dotenv import load_dotenv
+from app.config.setting import EMBEDDING_PROVIDER, EMBEDDING_PROCESSES, VECTOR_STORE_PATH
+from app.services.embedding_provider import LocalEmbeddings, get_embeddings, save_vector_store
+from app.utils.text_splitter import LegalTextSplitter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -13,56 +15,87 @@ logger = logging.getLogger(__name__)
 
 # Set up environment variables
 load_dotenv()
-os.environ['GOOGLE_API_KEY'] = os.getenv("GOOGLE_API_KEY")
 
-if not os.getenv("GOOGLE_API_KEY"):
-    raise ValueError("GOOGLE_API_KEY is not set. Please check your .env file.")
+if EMBEDDING_PROVIDER == "google" and not os.getenv("GOOGLE_API_KEY"):
+    raise ValueError("GOOGLE_API_KEY is not set. Please check your .env file, or set EMBEDDING_PROVIDER=local.")
 
-def embed_and_save_documents():
-    # Initialize embeddings and loader
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    loader = PyPDFDirectoryLoader("./Data")
-    logger.info("Loader initialized")
-    
-    # Check if the data directory exists and is not empty
-    if not os.path.exists("./Data") or not os.listdir("./Data"):
-        raise FileNotFoundError("The './Data' directory is empty or does not exist.")
-    
-    # Load documents from the directory
-    docs = loader.load()
-    logger.info(f"Loaded {len(docs)} documents from './Data'")
-    
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    final_documents = text_splitter.split_documents(docs)
-    logger.info(f"Split documents into {len(final_documents)} chunks")
-    
-    # Handle metadata for each document chunk
-    for doc in final_documents:
-        # Safely retrieve or set default metadata
-        source_file = doc.metadata.get('source', "unknown")
-        doc.metadata['source'] = os.path.basename(source_file)
-    
-    # Process documents in batches and create vector stores
+def iter_pdf_pages(path: str):
+    """Yield the text of each page without holding the whole PDF's text in memory."""
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def load_and_split_documents(data_dir: str = "./Data") -> list:
+    """Stream every PDF in `data_dir` through the legal splitter into chunk Documents."""
+    text_splitter = LegalTextSplitter(chunk_size=1000, chunk_overlap=200)
+    final_documents = []
+    pdf_files = sorted(name for name in os.listdir(data_dir) if name.lower().endswith(".pdf"))
+    for file_name in tqdm(pdf_files, desc="Splitting PDFs"):
+        for chunk in text_splitter.iter_chunks(iter_pdf_pages(os.path.join(data_dir, file_name))):
+            final_documents.append(Document(
+                page_content=chunk["text"],
+                metadata={
+                    "source": file_name,
+                    "page": chunk["page"],
+                    "chapter": chunk["chapter"],
+                    "section": chunk["section"],
+                    "start_index": chunk["start"],
+                },
+            ))
+    logger.info(f"Loaded {len(pdf_files)} documents from '{data_dir}'")
+    return final_documents
+
+
+def embed_documents_locally(documents: list, embeddings: LocalEmbeddings) -> FAISS:
+    """Encode every chunk with a pool of EMBEDDING_PROCESSES worker processes; no network needed."""
+    texts = [doc.page_content for doc in documents]
+    logger.info(f"Encoding {len(texts)} chunks with {embeddings.model_name} on {EMBEDDING_PROCESSES} processes")
+    vectors = embeddings.encode_multi_process(texts, EMBEDDING_PROCESSES)
+    return FAISS.from_embeddings(
+        zip(texts, vectors.tolist()), embeddings, metadatas=[doc.metadata for doc in documents],
+    )
+
+
+def embed_documents_remotely(documents: list, embeddings) -> FAISS:
+    """Embed chunks through the embedding API in batches and merge the batch stores."""
     batch_size = 100
-    batched_documents = [final_documents[i:i + batch_size] for i in range(0, len(final_documents), batch_size)]
+    batched_documents = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
     vector_stores = []
     for batch in tqdm(batched_documents, desc="Processing batches"):
         vector_store = FAISS.from_documents(batch, embeddings)
         vector_stores.append(vector_store)
     logger.info("Created vector stores for all batches")
-    
+
     # Merge all vector stores into one
     vectors = vector_stores[0]
     for vector_store in vector_stores[1:]:
         vectors.merge_from(vector_store)
     logger.info("Merged all vector stores into a single vector database")
+    return vectors
+
+
+def embed_and_save_documents():
+    # Initialize embeddings (EMBEDDING_PROVIDER: google or local)
+    embeddings = get_embeddings()
+    
+    # Check if the data directory exists and is not empty
+    if not os.path.exists("./Data") or not os.listdir("./Data"):
+        raise FileNotFoundError("The './Data' directory is empty or does not exist.")
+    
+    # Split documents into chunks along chapter, section and clause boundaries
+    final_documents = load_and_split_documents("./Data")
+    logger.info(f"Split documents into {len(final_documents)} chunks")
+    
+    if isinstance(embeddings, LocalEmbeddings):
+        vectors = embed_documents_locally(final_documents, embeddings)
+    else:
+        vectors = embed_documents_remotely(final_documents, embeddings)
     
-    # Save the final vector store to disk
-    output_dir = "Database"
-    os.makedirs(output_dir, exist_ok=True)
-    vectors.save_local(output_dir)
-    logger.info(f"Vector store saved to '{output_dir}'")
+    # Save the final vector store, with the embedding provider, model and dimension, to disk
+    save_vector_store(vectors, VECTOR_STORE_PATH, embeddings)
+    logger.info(f"Vector store saved to '{VECTOR_STORE_PATH}'")
 
-# Run the embedding and saving process
-embed_and_save_documents()
\ No newline at end of file
+# Run the embedding and saving process; the guard keeps the encoding worker processes from re-running it
+if __name__ == "__main__":
+    embed_and_save_documents()
@@ -10,4 +10,46 @@ CACHE_EXPIRY = int(os.getenv("CACHE_EXPIRY", 3600))  # Default: 1 hour (3600 sec
 MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
 MYSQL_USER = os.getenv("MYSQL_USER", "root")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "password")
-MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "document_qna")
\ No newline at end of file
+MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "document_qna")
+
+# Retrieval / prompt budget
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 4))  # Candidate chunks per question
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 256))  # Max document context per prompt, about one 1024-character chunk
+
+# Observability
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Uploaded document cache (keyed by content hash)
+DOC_CACHE_DIR = os.getenv("DOC_CACHE_DIR", "doc_cache/")  # Extracted text, chunks and embeddings
+DOC_MEMORY_CACHE_SIZE = int(os.getenv("DOC_MEMORY_CACHE_SIZE", 64))  # Documents kept indexed in memory
+DOC_DISK_CACHE_SIZE = int(os.getenv("DOC_DISK_CACHE_SIZE", 1000))  # Uploaded documents kept in DOC_CACHE_DIR
+
+# Language model gateway
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # e.g. http://127.0.0.1:8765 for a local fake server
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))  # In-flight requests per model
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))  # Deadline per call, including retries
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 8))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))  # Consecutive failures before opening
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", 0.95))  # Hedge calls slower than this latency quantile
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))  # Calls observed before hedging starts
+
+# Local legal corpus used to verify claims before searching the web
+LEGAL_CORPUS_DIR = os.getenv(
+    "LEGAL_CORPUS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "AI_Powered_Legal_Chatbot", "backend", "Data"),
+)
+CORPUS_CACHE_DIR = os.getenv("CORPUS_CACHE_DIR", "corpus_cache/")  # Chunked corpus, rebuilt when the PDFs change
+LOCAL_EVIDENCE_TOP_K = int(os.getenv("LOCAL_EVIDENCE_TOP_K", 4))  # Passages shown to the model
+LOCAL_EVIDENCE_TOKEN_BUDGET = int(os.getenv("LOCAL_EVIDENCE_TOKEN_BUDGET", 1500))
+LOCAL_EVIDENCE_MIN_COVERAGE = float(os.getenv("LOCAL_EVIDENCE_MIN_COVERAGE", 0.6))  # Share of claim terms the best passage must contain
+
+# Fact-checking against web sources
+FACT_CHECK_CONCURRENCY = int(os.getenv("FACT_CHECK_CONCURRENCY", 4))  # Sources fetched and analyzed at once
+FACT_CHECK_CONSENSUS_VERDICTS = int(os.getenv("FACT_CHECK_CONSENSUS_VERDICTS", 3))  # Agreeing verdicts needed to stop early
+FACT_CHECK_CONSENSUS_AGREEMENT = float(os.getenv("FACT_CHECK_CONSENSUS_AGREEMENT", 0.75))  # Share of decisive verdicts that must agree
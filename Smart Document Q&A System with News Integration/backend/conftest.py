@@ -0,0 +1 @@
+# Makes pytest put the backend directory on sys.path, so tests import its modules as the app does
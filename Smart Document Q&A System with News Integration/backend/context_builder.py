@@ -0,0 +1,134 @@
+import re
+
+# Gemini does not ship a local tokenizer; ~4 characters per token is close
+# enough for budgeting English legal text.
+CHARS_PER_TOKEN = 4
+
+# Shortest prefix/suffix match treated as splitter overlap rather than coincidence
+MIN_OVERLAP_CHARS = 40
+
+# Chunks sharing at least this fraction of word shingles are near-duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+
+# Don't bother appending a truncated chunk smaller than this
+MIN_PARTIAL_TOKENS = 50
+
+CHUNK_SEPARATOR = "\n\n"
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_END_RE = re.compile(r"[.;:!?]\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of tokens Gemini will count for a piece of text."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _edge_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    probe = right[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+
+    pos = left.find(probe, max(0, len(left) - len(right)))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+def _strip_overlap(chunk: str, selected: list[str]) -> str:
+    """Remove text at either edge of `chunk` that an already selected chunk carries."""
+    for other in selected:
+        overlap = _edge_overlap(other, chunk)
+        if overlap:
+            chunk = chunk[overlap:]
+        overlap = _edge_overlap(chunk, other)
+        if overlap:
+            chunk = chunk[:-overlap]
+    return chunk.strip()
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to fit `max_tokens`, preferring a sentence or word boundary."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+
+    head = text[:limit]
+    sentence_ends = [m.end() for m in _SENTENCE_END_RE.finditer(head)]
+    if sentence_ends and sentence_ends[-1] > limit // 2:
+        return head[:sentence_ends[-1]].strip()
+
+    space = head.rfind(" ")
+    if space > limit // 2:
+        return head[:space].strip()
+    return head.strip()
+
+
+def build_context(chunks: list[str], token_budget: int) -> dict:
+    """
+    Pack retrieved chunks into a prompt context that fits a token budget.
+
+    `chunks` must be ordered most relevant first. Exact and near-duplicate chunks
+    are dropped, text repeated through the splitter's overlap is stripped, and the
+    remaining chunks are added in relevance order until the budget is spent; the
+    last one is truncated at a sentence boundary if it does not fit whole.
+
+    Returns a dict with the packed `text`, the kept `chunks`, their `indices` in the
+    input list, the `tokens` used and the number of `dropped` chunks.
+    """
+    selected = []
+    indices = []
+    seen_shingles = []
+    tokens_used = 0
+    separator_tokens = estimate_tokens(CHUNK_SEPARATOR)
+
+    for index, chunk in enumerate(chunks):
+        chunk = (chunk or "").strip()
+        if not chunk or any(chunk in other for other in selected):
+            continue
+
+        shingles = _shingles(chunk)
+        if any(len(shingles & other) / len(shingles | other) >= NEAR_DUPLICATE_THRESHOLD
+               for other in seen_shingles):
+            continue
+
+        chunk = _strip_overlap(chunk, selected)
+        if not chunk:
+            continue
+
+        cost = estimate_tokens(chunk) + (separator_tokens if selected else 0)
+        remaining = token_budget - tokens_used
+        if cost > remaining:
+            remaining -= separator_tokens if selected else 0
+            if remaining >= MIN_PARTIAL_TOKENS:
+                chunk = _truncate_to_tokens(chunk, remaining)
+                selected.append(chunk)
+                indices.append(index)
+                tokens_used += estimate_tokens(chunk) + (separator_tokens if len(selected) > 1 else 0)
+            break
+
+        selected.append(chunk)
+        indices.append(index)
+        seen_shingles.append(shingles)
+        tokens_used += cost
+
+    return {
+        "text": CHUNK_SEPARATOR.join(selected),
+        "chunks": selected,
+        "indices": indices,
+        "tokens": tokens_used,
+        "dropped": len(chunks) - len(selected),
+    }
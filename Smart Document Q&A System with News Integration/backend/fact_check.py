@@ -1,27 +1,24 @@
 import requests
 from bs4 import BeautifulSoup
-import google.generativeai as genai
-import os
 import json
 from urllib.parse import urlparse, parse_qs, unquote
-import time
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# --- Configuration ---
+from config import (
+    LOCAL_EVIDENCE_TOP_K, LOCAL_EVIDENCE_TOKEN_BUDGET, LOCAL_EVIDENCE_MIN_COVERAGE,
+    FACT_CHECK_CONCURRENCY, FACT_CHECK_CONSENSUS_VERDICTS, FACT_CHECK_CONSENSUS_AGREEMENT,
+)
+from context_builder import build_context
+from legal_corpus import LegalCorpus
+from metrics import instrument, increment
+from llm_gateway import gateway
+
+logger = logging.getLogger(__name__)
 
-# Set up the Google API key for Gemini AI
-try:
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise KeyError("GOOGLE_API_KEY environment variable not set.")
-    genai.configure(api_key=api_key)
-    llm_model = genai.GenerativeModel("gemini-1.5-pro")
-    print("Gemini API configured successfully.")
-except KeyError as e:
-    print(f"ERROR: {e}")
-    exit(1)
-except Exception as e:
-    print(f"Error configuring Gemini API: {e}")
-    exit(1)
+# --- Configuration ---
 
 # List of authoritative legal sources
 LEGAL_SOURCES = [
@@ -37,6 +34,13 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
 }
 
+# Verdicts that settle a claim without searching the web
+CONCLUSIVE_STATUSES = ("Supports", "Contradicts")
+
+# Statutes and judgments held locally; loading starts now so early claims do not wait
+legal_corpus = LegalCorpus()
+legal_corpus.load_async()
+
 # Constants
 REQUEST_DELAY_SECONDS = 2
 MAX_RESULTS_PER_SOURCE = 2
@@ -45,57 +49,47 @@ FETCH_TIMEOUT_SECONDS = 15
 
 # --- Helper Functions ---
 
-def search_duckduckgo(query: str, max_results: int = MAX_RESULTS_PER_SOURCE) -> dict:
+@instrument("search_duckduckgo")
+def search_source(query: str, source: str, max_results: int = MAX_RESULTS_PER_SOURCE) -> list[str]:
     """
-    Search authoritative legal websites using DuckDuckGo and extract URLs.
+    Search one authoritative legal website using DuckDuckGo and extract result URLs.
     """
-    results = {}
-    print(f"[Search] Searching DuckDuckGo for: '{query}'")
+    search_query = f"site:{source} {query}"
+    url = f"https://html.duckduckgo.com/html/?q={search_query}"
+    logger.info(f"Querying: {url}")
 
-    for source in LEGAL_SOURCES:
-        search_query = f"site:{source} {query}"
-        url = f"https://html.duckduckgo.com/html/?q={search_query}"
-        print(f"  Querying: {url}")
+    response = requests.get(url, headers=HEADERS, timeout=FETCH_TIMEOUT_SECONDS)
+    response.raise_for_status()
 
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=FETCH_TIMEOUT_SECONDS)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            links = soup.find_all("a", class_="result__a", href=True)
-
-            valid_links = []
-            for link in links:
-                raw_href = link["href"]
-                if "duckduckgo.com/y.js" in raw_href:
-                    parsed_url = urlparse(raw_href)
-                    query_params = parse_qs(parsed_url.query)
-                    if "uddg" in query_params:
-                        href = unquote(query_params["uddg"][0])
-                        if source in urlparse(href).netloc:
-                            valid_links.append(href)
-                            if len(valid_links) >= max_results:
-                                break
-            if valid_links:
-                results[source] = valid_links
-            time.sleep(REQUEST_DELAY_SECONDS)
-        except Exception as e:
-            print(f"  Error searching {source}: {e}")
-            results[source] = [f"Error: {e}"]
-
-    return results
+    soup = BeautifulSoup(response.text, "html.parser")
+    links = soup.find_all("a", class_="result__a", href=True)
 
+    valid_links = []
+    for link in links:
+        raw_href = link["href"]
+        if "duckduckgo.com/y.js" in raw_href:
+            parsed_url = urlparse(raw_href)
+            query_params = parse_qs(parsed_url.query)
+            if "uddg" in query_params:
+                href = unquote(query_params["uddg"][0])
+                if source in urlparse(href).netloc:
+                    valid_links.append(href)
+                    if len(valid_links) >= max_results:
+                        break
+    return valid_links
+
+@instrument("fetch_and_extract_content")
 def fetch_and_extract_content(url: str) -> str:
     """
     Fetch content from a URL and extract meaningful text.
     """
-    print(f"[Fetch] Fetching content from: {url}")
+    logger.info(f"[Fetch] Fetching content from: {url}")
     try:
         response = requests.get(url, headers=HEADERS, timeout=FETCH_TIMEOUT_SECONDS)
         response.raise_for_status()
 
         if "html" not in response.headers.get("Content-Type", "").lower():
-            print("  Skipping non-HTML content.")
+            logger.warning("Skipping non-HTML content.")
             return None
 
         soup = BeautifulSoup(response.content, "html.parser")
@@ -116,14 +110,23 @@ def fetch_and_extract_content(url: str) -> str:
         cleaned_text = " ".join(text_content.split())
         return cleaned_text[:MAX_CONTENT_LENGTH] if cleaned_text else None
     except Exception as e:
-        print(f"  Error fetching content from {url}: {e}")
+        logger.error(f"Error fetching content from {url}: {e}")
         return None
 
+def parse_json_response(response_text: str) -> dict:
+    """Parse a JSON answer from the model, with or without a ```json fence."""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:].strip()
+    if response_text.endswith("```"):
+        response_text = response_text[:-3].strip()
+    return json.loads(response_text)
+
 def analyze_claim_with_llm(claim: str, source_text: str, source_url: str) -> dict:
     """
     Analyze the claim against the source text using Gemini AI.
     """
-    print(f"[Analyze] Analyzing claim with content from {source_url}")
+    logger.info(f"[Analyze] Analyzing claim with content from {source_url}")
     prompt = f"""
     Analyze the following legal claim against the provided source text.
 
@@ -141,17 +144,9 @@ def analyze_claim_with_llm(claim: str, source_text: str, source_url: str) -> dic
     """
 
     try:
-        response = llm_model.generate_content(prompt)
-        response_text = response.text.strip()
-
-        if response_text.startswith("```json"):
-            response_text = response_text[7:].strip()
-        if response_text.endswith("```"):
-            response_text = response_text[:-3].strip()
-
-        return json.loads(response_text)
+        return parse_json_response(gateway.generate(prompt))
     except Exception as e:
-        print(f"  Error analyzing claim: {e}")
+        logger.error(f"Error analyzing claim: {e}")
         return {
             "status": "Error",
             "reasoning": f"Failed to analyze claim: {e}",
@@ -159,44 +154,204 @@ def analyze_claim_with_llm(claim: str, source_text: str, source_url: str) -> dic
             "source_url": source_url,
         }
 
-# --- Main Function ---
-
-def fact_check_legal_claim(claim: str) -> dict:
+def verify_with_local_corpus(claim: str) -> dict | None:
     """
-    Fact-check a legal claim by searching authoritative sources and analyzing content.
+    Analyze the claim against the best passages from the local statutes and judgments
+    in a single model call. Returns None when there is no usable local evidence.
     """
-    print(f"\n[FactCheck] Starting fact-check for claim: '{claim}'")
-    sources = search_duckduckgo(claim)
-    results = []
+    if not legal_corpus.ready:
+        logger.info("[Local] Legal corpus not loaded yet; skipping local verification.")
+        return None
+
+    passages = legal_corpus.search(claim, top_k=LOCAL_EVIDENCE_TOP_K)
+    if not passages or max(p["coverage"] for p in passages) < LOCAL_EVIDENCE_MIN_COVERAGE:
+        logger.info(f"[Local] No local passage covers the claim: '{claim}'")
+        return None
+
+    packed = build_context([p["text"] for p in passages], LOCAL_EVIDENCE_TOKEN_BUDGET)
+    selected = [
+        {**passages[index], "text": text} for index, text in zip(packed["indices"], packed["chunks"])
+    ]
+    numbered = "\n\n".join(
+        f"[{number}] {p['source']}, page {p['page']}:\n{p['text']}" for number, p in enumerate(selected, 1)
+    )
+    logger.info(f"[Local] Analyzing claim against {len(selected)} local passages")
+    prompt = f"""
+    Verify the following legal claim using only the numbered passages from Indian statutes and judgments.
+
+    Claim: "{claim}"
+
+    Passages:
+    {numbered}
+
+    Instructions:
+    - Determine if the passages support or contradict the claim, or are not enough to decide it.
+    - Provide a JSON response with the following keys:
+      - "status": One of ["Supports", "Contradicts", "Inconclusive"].
+      - "reasoning": A brief explanation.
+      - "quote": A direct quote from the passages (if applicable).
+      - "passage": The number of the passage quoted (if applicable).
+    """
+
+    try:
+        analysis = parse_json_response(gateway.generate(prompt))
+    except Exception as e:
+        logger.error(f"Error analyzing claim against local passages: {e}")
+        return None
 
-    for source, urls in sources.items():
-        if isinstance(urls, list) and not urls[0].startswith("Error"):
-            for url in urls:
-                content = fetch_and_extract_content(url)
-                if content:
-                    analysis = analyze_claim_with_llm(claim, content, url)
-                    results.append(analysis)
-                else:
-                    results.append({
-                        "status": "Error",
-                        "reasoning": "Failed to fetch or extract content.",
-                        "quote": "",
-                        "source_url": url,
-                    })
-
-    summary = {
+    try:
+        cited = selected[int(analysis.get("passage") or 1) - 1]
+    except (TypeError, ValueError, IndexError):
+        cited = selected[0]
+    return {
+        "status": analysis.get("status", "Inconclusive"),
+        "reasoning": analysis.get("reasoning", ""),
+        "quote": analysis.get("quote", ""),
+        "source_url": f"{cited['source']}#page={cited['page']}",
+    }
+
+def summarize_results(results: list[dict]) -> dict:
+    return {
         "supports": sum(1 for r in results if r.get("status") == "Supports"),
         "contradicts": sum(1 for r in results if r.get("status") == "Contradicts"),
         "irrelevant": sum(1 for r in results if r.get("status") == "Irrelevant"),
         "errors": sum(1 for r in results if r.get("status") == "Error"),
     }
 
-    return {
+def consensus_reached(summary: dict) -> bool:
+    """Whether enough sources agree that the remaining ones cannot change the verdict."""
+    decisive = summary["supports"] + summary["contradicts"]
+    leading = max(summary["supports"], summary["contradicts"])
+    return leading >= FACT_CHECK_CONSENSUS_VERDICTS and leading / decisive >= FACT_CHECK_CONSENSUS_AGREEMENT
+
+def check_source(claim: str, url: str, cancelled: threading.Event) -> dict | None:
+    """Fetch one source and analyze the claim against it; None if cancelled before the model call."""
+    content = fetch_and_extract_content(url)
+    if cancelled.is_set():
+        return None
+    if not content:
+        return {
+            "status": "Error",
+            "reasoning": "Failed to fetch or extract content.",
+            "quote": "",
+            "source_url": url,
+        }
+    return analyze_claim_with_llm(claim, content, url)
+
+# --- Main Functions ---
+
+def iter_fact_check(claim: str):
+    """
+    Fact-check a legal claim, yielding events as they happen: a "verdict" event with
+    the running summary for every source analyzed, then one "done" event with all
+    results. The local statutes and judgments are tried first; otherwise sources
+    are searched one site at a time while the pages found so far are fetched and
+    analyzed concurrently. Once the verdicts reach consensus, queued sources are
+    cancelled and running ones skip their model call.
+    """
+    logger.info(f"[FactCheck] Starting fact-check for claim: '{claim}'")
+    local_result = verify_with_local_corpus(claim)
+    if local_result is not None and local_result["status"] in CONCLUSIVE_STATUSES:
+        increment("fact_check_local_verdict")
+        results = [local_result]
+        summary = summarize_results(results)
+        yield {"event": "verdict", "result": local_result, "summary": summary}
+        yield {
+            "event": "done",
+            "claim": claim,
+            "results": results,
+            "summary": summary,
+            "evidence_source": "local_corpus",
+            "stopped_early": False,
+        }
+        return
+
+    increment("fact_check_web_fallback")
+    logger.info(f"[Search] Searching DuckDuckGo for: '{claim}'")
+    cancelled = threading.Event()
+    events = queue.Queue()
+    # Held while checking `cancelled` and submitting, and while cancelling, so no
+    # source is submitted to the executor after it has been shut down
+    submit_lock = threading.Lock()
+    executor = ThreadPoolExecutor(max_workers=FACT_CHECK_CONCURRENCY, thread_name_prefix="fact-check")
+
+    def search_sources():
+        try:
+            for index, source in enumerate(LEGAL_SOURCES):
+                # Keep the pause between DuckDuckGo queries, but stop waiting once cancelled
+                if cancelled.is_set() or (index and cancelled.wait(REQUEST_DELAY_SECONDS)):
+                    break
+                try:
+                    urls = search_source(claim, source)
+                except Exception as e:
+                    logger.error(f"Error searching {source}: {e}")
+                    continue
+                for url in urls:
+                    with submit_lock:
+                        if cancelled.is_set():
+                            break
+                        future = executor.submit(check_source, claim, url, cancelled)
+                    events.put(("submitted", future))
+                    future.add_done_callback(lambda done: events.put(("finished", done)))
+        finally:
+            events.put(("searched", None))
+
+    threading.Thread(target=search_sources, name="fact-check-search", daemon=True).start()
+
+    results = []
+    outstanding = set()
+    searching = True
+    stopped_early = False
+    try:
+        while searching or outstanding:
+            kind, future = events.get()
+            if kind == "searched":
+                searching = False
+            elif kind == "submitted":
+                outstanding.add(future)
+            elif future in outstanding:
+                outstanding.discard(future)
+                result = None if future.cancelled() or future.exception() else future.result()
+                if result is None:
+                    continue
+                results.append(result)
+                summary = summarize_results(results)
+                yield {"event": "verdict", "result": result, "summary": summary}
+                if consensus_reached(summary):
+                    stopped_early = searching or bool(outstanding)
+                    break
+    finally:
+        # Also runs when a streaming client disconnects and the generator is closed
+        with submit_lock:
+            cancelled.set()
+        skipped = sum(future.cancel() or future.running() for future in outstanding)
+        executor.shutdown(wait=False, cancel_futures=True)
+        if skipped:
+            increment("fact_check_sources_skipped", skipped)
+
+    if stopped_early:
+        increment("fact_check_early_stop")
+        logger.info(f"[FactCheck] Consensus after {len(results)} sources; remaining sources skipped")
+    yield {
+        "event": "done",
         "claim": claim,
         "results": results,
-        "summary": summary,
+        "summary": summarize_results(results),
+        "evidence_source": "web",
+        "stopped_early": stopped_early,
     }
 
+def fact_check_legal_claim(claim: str) -> dict:
+    """
+    Fact-check a legal claim, first against the local statutes and judgments and,
+    only if they do not settle it, by searching authoritative sources online.
+    """
+    final = {}
+    for event in iter_fact_check(claim):
+        final = event
+    final.pop("event", None)
+    return final
+
 # --- Example Usage ---
 '''if __name__ == "__main__":
     test_claim = "Is Section 124A of the Indian Penal Code related to sedition?"
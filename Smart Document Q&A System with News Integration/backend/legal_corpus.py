@@ -0,0 +1,251 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+import pypdf
+
+from config import LEGAL_CORPUS_DIR, CORPUS_CACHE_DIR
+from text_splitter import LegalTextSplitter
+from metrics import instrument
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Added to the score of passages holding the exact section or article a claim cites
+SECTION_MATCH_BOOST = 10.0
+# Passages where this many provisions start are tables of contents, not the provisions themselves
+TOC_MIN_HEADINGS = 8
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Words are truncated to this many characters so "seditious" matches "sedition"
+# and "punishable" matches "punishment"
+STEM_LENGTH = 6
+STOPWORDS = frozenset(
+    "a an and are as at be by can cannot deals does for from has have in is it its not of on or "
+    "that the their there this to under was what when which who whom will with".split()
+)
+# Words that only say where a provision is; left out when measuring how much of a claim a passage covers
+CITATION_STEMS = frozenset(
+    term[:STEM_LENGTH] for term in
+    "section sections sec s article articles art act code indian penal ipc crpc criminal procedure "
+    "constitution information technology".split()
+)
+
+# How claims name the acts we hold, mapped to a fragment of the PDF's file name
+ACT_ALIASES = [
+    (re.compile(r"\b(?:ipc|i\.p\.c\.?|indian penal code|penal code)", re.I), "ipc"),
+    (re.compile(r"\b(?:crpc|cr\.?p\.?c\.?|code of criminal procedure|criminal procedure code)", re.I), "criminal_procedure"),
+    (re.compile(r"\b(?:constitution|article|art\.)", re.I), "coi"),
+    (re.compile(r"\b(?:it act|information technology act)", re.I), "it code"),
+]
+# Start of a provision in a bare act, including amended ones such as "10[124A. Sedition.—"
+PROVISION_RE = re.compile(
+    r"(?:^|\n)[ \t]*(?:\d{1,3}\[)?(?:(?:Section|Article|SECTION|ARTICLE)\s+)?"
+    r"(\d{1,3}[A-Z]{0,3})\.[ \t]*(?=[A-Z\[(\"'])"
+)
+SECTION_REF_RE = re.compile(
+    r"\b(?:sections?|sec\.?|s\.|articles?|art\.)\s*(\d{1,3}[a-z]{0,3})\b"
+    r"|\b(\d{1,3}[a-z]{0,3})\s+(?:of\s+the\s+)?(?:ipc|crpc|cr\.?p\.?c)\b",
+    re.I,
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token[:STEM_LENGTH] for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def section_references(claim: str) -> list[tuple[str | None, str]]:
+    """(file name fragment or None, section number) pairs cited in a claim, e.g. ("ipc", "302")."""
+    numbers = {(m.group(1) or m.group(2)).upper() for m in SECTION_REF_RE.finditer(claim)}
+    acts = [fragment for pattern, fragment in ACT_ALIASES if pattern.search(claim)] or [None]
+    return [(act, number) for number in sorted(numbers) for act in acts]
+
+
+def provisions_in(text: str) -> list[str]:
+    """Numbers of the sections or articles that start inside a passage."""
+    return [number.upper() for number in PROVISION_RE.findall(text)]
+
+
+class LegalCorpus:
+    """
+    BM25 index over the statutes and judgments in `data_dir`, chunked along their
+    section structure. Chunks are cached in `cache_dir` and rebuilt only when the
+    PDFs change; building from scratch takes about a minute, so `load_async()`
+    does it in the background and `search()` reports nothing until it is ready.
+    """
+
+    def __init__(self, data_dir: str = LEGAL_CORPUS_DIR, cache_dir: str = CORPUS_CACHE_DIR):
+        self.data_dir = data_dir
+        self.cache_path = os.path.join(cache_dir, "legal_corpus.json")
+        self.chunks = []
+        self._postings = {}
+        self._idf = {}
+        self._length_norm = None
+        self._sections = defaultdict(list)
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _pdf_files(self) -> list[str]:
+        return sorted(name for name in os.listdir(self.data_dir) if name.lower().endswith(".pdf"))
+
+    def _fingerprint(self, files: list[str]) -> list:
+        stats = [os.stat(os.path.join(self.data_dir, name)) for name in files]
+        return [CACHE_VERSION, CHUNK_SIZE, CHUNK_OVERLAP] + [
+            [name, stat.st_size, stat.st_mtime_ns] for name, stat in zip(files, stats)
+        ]
+
+    def _read_cache(self, fingerprint: list) -> list | None:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable corpus cache {self.cache_path}: {e}")
+            return None
+        return cached["chunks"] if cached.get("fingerprint") == fingerprint else None
+
+    def _build(self, files: list[str]) -> list[dict]:
+        splitter = LegalTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        chunks = []
+        for name in files:
+            try:
+                reader = pypdf.PdfReader(os.path.join(self.data_dir, name))
+                pages = (page.extract_text() or "" for page in reader.pages)
+                for chunk in splitter.iter_chunks(pages):
+                    chunks.append({
+                        "text": chunk["text"],
+                        "source": name,
+                        "page": chunk["page"],
+                        "chapter": chunk["chapter"],
+                        "section": chunk["section"],
+                    })
+            except Exception as e:
+                logger.error(f"Error reading {name} for the legal corpus: {e}")
+        return chunks
+
+    @instrument("load_legal_corpus")
+    def load(self):
+        """Load the cached chunks (or build them) and index them. Safe to call repeatedly."""
+        with self._lock:
+            if self.ready:
+                return
+            if not os.path.isdir(self.data_dir):
+                logger.error(
+                    f"Legal corpus directory {os.path.abspath(self.data_dir)} does not exist; every claim "
+                    f"will be checked on the web. Set LEGAL_CORPUS_DIR or mount the corpus there."
+                )
+                return
+            files = self._pdf_files()
+            if not files:
+                logger.warning(f"No PDFs found in {self.data_dir}; claims will be checked on the web only.")
+                return
+
+            fingerprint = self._fingerprint(files)
+            chunks = self._read_cache(fingerprint)
+            if chunks is None:
+                logger.info(f"Building the legal corpus from {len(files)} PDFs in {self.data_dir}")
+                chunks = self._build(files)
+                try:
+                    os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                    with open(self.cache_path, "w", encoding="utf-8") as f:
+                        json.dump({"fingerprint": fingerprint, "chunks": chunks}, f, ensure_ascii=False)
+                except Exception as e:
+                    logger.error(f"Error caching the legal corpus: {e}")
+
+            self._index(chunks)
+            self._ready.set()
+            logger.info(f"Legal corpus ready: {len(chunks)} passages from {len(files)} documents")
+
+    def load_async(self):
+        threading.Thread(target=self.load, name="legal-corpus", daemon=True).start()
+
+    def _index(self, chunks: list[dict]):
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        sections = defaultdict(list)
+        for doc, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                ids, tfs = postings[term]
+                ids.append(doc)
+                tfs.append(tf)
+            provisions = provisions_in(chunk["text"])
+            if len(provisions) < TOC_MIN_HEADINGS:
+                for number in provisions:
+                    sections[number].append(doc)
+
+        total = max(len(chunks), 1)
+        average_length = float(lengths.mean()) if len(chunks) else 1.0
+        self.chunks = chunks
+        self._postings = {
+            term: (np.array(ids, dtype=np.int32), np.array(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+        self._idf = {
+            term: math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, (ids, _) in self._postings.items()
+        }
+        self._length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(average_length, 1.0))
+        self._sections = sections
+
+    def _contains(self, term: str, doc: int) -> bool:
+        ids = self._postings[term][0]
+        position = np.searchsorted(ids, doc)
+        return position < len(ids) and ids[position] == doc
+
+    @instrument("search_legal_corpus")
+    def search(self, query: str, top_k: int = 4) -> list[dict]:
+        """
+        Best passages for `query`, each with its BM25 `score`, the share of query
+        terms it contains (`coverage`) and whether it holds a cited section.
+        """
+        if not self.ready or not self.chunks:
+            return []
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self._postings]
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in terms:
+            ids, tfs = self._postings[term]
+            scores[ids] += self._idf[term] * tfs * (BM25_K1 + 1) / (tfs + self._length_norm[ids])
+
+        cited = set()
+        for act, number in section_references(query):
+            for doc in self._sections.get(number, ()):
+                if act is None or act in self.chunks[doc]["source"].lower():
+                    cited.add(doc)
+        for doc in cited:
+            scores[doc] += SECTION_MATCH_BOOST
+
+        # Coverage counts what the claim says, not where it says it is
+        cited_numbers = {number.lower() for _, number in section_references(query)}
+        content_terms = [term for term in dict.fromkeys(tokenize(query))
+                         if term not in CITATION_STEMS and term not in cited_numbers]
+        indexed_terms = [term for term in content_terms if term in self._postings]
+        top = np.argsort(-scores)[:top_k]
+        return [
+            {
+                **self.chunks[doc],
+                "score": round(float(scores[doc]), 3),
+                "coverage": round(
+                    sum(self._contains(term, doc) for term in indexed_terms) / max(len(content_terms), 1), 3
+                ),
+                "cites_section": int(doc) in cited,
+            }
+            for doc in top if scores[doc] > 0
+        ]
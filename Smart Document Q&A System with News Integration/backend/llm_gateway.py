@@ -0,0 +1,384 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import google.generativeai as genai
+
+from config import (
+    GOOGLE_API_KEY, GEMINI_MODEL, GEMINI_API_ENDPOINT,
+    LLM_MAX_CONCURRENCY, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY,
+    LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN, LLM_HEDGE_ENABLED, LLM_HEDGE_QUANTILE, LLM_HEDGE_MIN_SAMPLES,
+)
+from context_builder import estimate_tokens
+from metrics import timed, increment, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Rate limits, server errors and timeouts are worth another attempt; anything else
+# (bad request, blocked prompt, parsing) would fail the same way again.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "Timeout", "ConnectTimeout", "ReadTimeout", "ConnectionError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+}
+
+# Recent successful call latencies kept per model to derive the hedge delay
+LATENCY_WINDOW = 200
+
+
+class LLMError(Exception):
+    """Raised by the gateway itself rather than by the model."""
+
+
+class LLMTimeoutError(LLMError):
+    """The call did not finish before its deadline."""
+
+
+class QueueTimeoutError(LLMTimeoutError):
+    """No concurrency slot became free before the deadline."""
+
+
+class CircuitOpenError(LLMError):
+    """The model has been failing and calls are rejected until the cooldown ends."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed model call should be retried."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    response = getattr(exc, "response", None)
+    for status in (getattr(exc, "code", None), getattr(exc, "status_code", None),
+                   getattr(response, "status_code", None)):
+        if isinstance(status, int) and status in RETRYABLE_STATUS_CODES:
+            return True
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `cooldown`
+    seconds, then lets a single trial call through (half-open) to decide whether to
+    close again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """End a trial call that settled nothing (e.g. it never reached the model)."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            reopen = self._trial_running or (self._opened_at is None and self._failures >= self.threshold)
+            self._trial_running = False
+            if reopen:
+                self._opened_at = time.monotonic()
+            return reopen
+
+
+class _ModelChannel:
+    """Concurrency slots, circuit breaker and accounting for one model."""
+
+    def __init__(self, name: str, max_concurrency: int, breaker: CircuitBreaker):
+        self.name = name
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        # Every submitted attempt holds a slot, so the pool never queues work
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"llm-{name}")
+        self.breaker = breaker
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = dict.fromkeys(
+            ("calls", "attempts", "failures", "retries", "timeouts", "rejected",
+             "hedges", "hedge_wins", "prompt_tokens", "completion_tokens"), 0)
+        self.lock = threading.Lock()
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.counts[key] += amount
+
+    def latency_quantile(self, quantile: float, min_samples: int = 1) -> float | None:
+        with self.lock:
+            if len(self.latencies) < max(1, min_samples):
+                return None
+            values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(quantile * len(values)))]
+
+
+def _response_text(result) -> str:
+    """Best-effort text of a model response, used to estimate output tokens."""
+    if isinstance(result, str):
+        return result
+    generations = getattr(result, "generations", None)
+    if generations:
+        return "".join(generation.text for generation in generations)
+    try:
+        return getattr(result, "text", "") or ""
+    except ValueError:  # Gemini raises when a response was blocked
+        return ""
+
+
+def _usage(result, prompt_tokens: int) -> tuple[int, int]:
+    """(prompt, completion) tokens, as reported by Gemini or estimated from the text."""
+    metadata = getattr(result, "usage_metadata", None)
+    if metadata is not None and getattr(metadata, "prompt_token_count", None):
+        return metadata.prompt_token_count, getattr(metadata, "candidates_token_count", 0) or 0
+    return prompt_tokens, estimate_tokens(_response_text(result))
+
+
+class LLMGateway:
+    """
+    Single entry point for model calls. Per model it enforces a concurrency limit
+    and a circuit breaker; per call a deadline covering queueing and retries,
+    jittered exponential backoff on retryable errors, and optionally a hedged
+    second request once the first has been running longer than the model's recent
+    p95 latency. Successful calls feed token and latency accounting.
+
+    Python threads cannot be cancelled: an attempt abandoned at the deadline, or
+    the losing side of a hedge, keeps its slot until the provider answers, so the
+    limit always reflects requests actually in flight.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+        retry_max_delay: float = LLM_RETRY_MAX_DELAY,
+        breaker_threshold: int = LLM_BREAKER_THRESHOLD,
+        breaker_cooldown: float = LLM_BREAKER_COOLDOWN,
+        hedge: bool = LLM_HEDGE_ENABLED,
+        hedge_quantile: float = LLM_HEDGE_QUANTILE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self._channels = {}
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, model: str) -> _ModelChannel:
+        with self._lock:
+            channel = self._channels.get(model)
+            if channel is None:
+                breaker = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+                channel = self._channels[model] = _ModelChannel(model, self.max_concurrency, breaker)
+            return channel
+
+    def call(self, model: str, fn, *args, timeout: float | None = None, hedge: bool | None = None,
+             prompt_tokens: int = 0, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` as a call to `model` and return its result.
+        Raises LLMTimeoutError, CircuitOpenError or the model's own last error.
+        Only enable `hedge` for calls without side effects, since both requests run.
+        """
+        channel = self._channel(model)
+        deadline = time.monotonic() + (timeout or self.timeout)
+        hedge = self.hedge if hedge is None else hedge
+        channel.count("calls")
+
+        with timed("llm_call"):
+            for attempt in range(self.max_retries + 1):
+                if not channel.breaker.allow():
+                    channel.count("rejected")
+                    increment("llm_circuit_rejected")
+                    raise CircuitOpenError(f"Circuit open for {model}; not calling it for up to {self.breaker_cooldown:.0f}s.")
+                # Set once the breaker has been told the outcome; any other exit must
+                # still end a half-open trial, or the circuit would reject calls forever
+                settled = False
+                try:
+                    result, latency = self._attempt(channel, fn, args, kwargs, deadline, hedge)
+                except QueueTimeoutError:
+                    # Our own backlog, not a model failure: leave the failure count alone
+                    channel.count("timeouts")
+                    increment("llm_queue_timeout")
+                    raise
+                except Exception as e:
+                    timed_out = isinstance(e, LLMTimeoutError)
+                    settled = True
+                    if not (timed_out or is_retryable(e)):
+                        # The model answered; the request itself was the problem
+                        channel.breaker.record_success()
+                        raise
+                    channel.count("failures")
+                    if channel.breaker.record_failure():
+                        increment("llm_circuit_opened")
+                        logger.error(f"Circuit opened for {model} after repeated failures: {e}")
+                    if timed_out:
+                        channel.count("timeouts")
+                        increment("llm_timeout")
+                        raise
+
+                    delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                    if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                        raise
+                    channel.count("retries")
+                    increment("llm_retry")
+                    logger.warning(f"Retrying {model} in {delay:.2f}s after: {e}")
+                    time.sleep(delay)
+                    continue
+                else:
+                    settled = True
+                    channel.breaker.record_success()
+                finally:
+                    if not settled:
+                        channel.breaker.release_trial()
+
+                prompt, completion = _usage(result, prompt_tokens)
+                with channel.lock:
+                    channel.latencies.append(latency)
+                    channel.counts["prompt_tokens"] += prompt
+                    channel.counts["completion_tokens"] += completion
+                count_tokens(model, "prompt", prompt)
+                count_tokens(model, "completion", completion)
+                return result
+
+    def _submit(self, channel: _ModelChannel, fn, args, kwargs, deadline: float, block: bool = True):
+        """Start one attempt once a slot is free; returns None if `block` is False and none is."""
+        if block:
+            acquired = channel.slots.acquire(timeout=max(0.0, deadline - time.monotonic()))
+        else:
+            acquired = channel.slots.acquire(blocking=False)
+        if not acquired:
+            if block:
+                raise QueueTimeoutError(f"Timed out waiting for a free {channel.name} slot.")
+            return None
+
+        def run():
+            start = time.perf_counter()
+            try:
+                with timed("generate_content"):
+                    result = fn(*args, **kwargs)
+                return result, time.perf_counter() - start
+            finally:
+                channel.slots.release()
+
+        try:
+            future = channel.executor.submit(run)
+        except Exception:
+            channel.slots.release()
+            raise
+        channel.count("attempts")
+        return future
+
+    def _attempt(self, channel: _ModelChannel, fn, args, kwargs, deadline: float, hedge: bool):
+        """One (possibly hedged) attempt; returns (result, latency)."""
+        primary = self._submit(channel, fn, args, kwargs, deadline)
+        pending = {primary}
+
+        hedge_delay = channel.latency_quantile(self.hedge_quantile, self.hedge_min_samples) if hedge else None
+        if hedge_delay is not None:
+            done, _ = wait(pending, timeout=min(hedge_delay, max(0.0, deadline - time.monotonic())))
+            # Never hedge into a saturated model: the backup only runs if a slot is free now
+            if not done and time.monotonic() < deadline:
+                backup = self._submit(channel, fn, args, kwargs, deadline, block=False)
+                if backup is not None:
+                    pending.add(backup)
+                    channel.count("hedges")
+                    increment("llm_hedge")
+
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        channel.count("hedge_wins")
+                        increment("llm_hedge_win")
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise LLMTimeoutError(f"{channel.name} did not answer within the deadline.")
+
+    # --- Gemini ---
+
+    def _model(self, model: str):
+        with self._lock:
+            if model not in self._models:
+                self._models[model] = genai.GenerativeModel(model)
+            return self._models[model]
+
+    def generate(self, prompt: str, model: str = GEMINI_MODEL, timeout: float | None = None,
+                 hedge: bool | None = None) -> str:
+        """Generate text for `prompt` with a Gemini model."""
+        timeout = timeout or self.timeout
+        response = self.call(
+            model, self._model(model).generate_content, prompt,
+            timeout=timeout, hedge=hedge, prompt_tokens=estimate_tokens(prompt),
+            request_options={"timeout": timeout},
+        )
+        return response.text
+
+    def stats(self) -> dict:
+        """Per-model counters, token totals, latency percentiles and breaker state."""
+        report = {}
+        for name, channel in list(self._channels.items()):
+            with channel.lock:
+                counts = dict(channel.counts)
+            report[name] = {
+                **counts,
+                "latency_p50_s": round(channel.latency_quantile(0.5) or 0.0, 4),
+                "latency_p95_s": round(channel.latency_quantile(0.95) or 0.0, 4),
+                "circuit": channel.breaker.state,
+            }
+        return report
+
+
+if not GOOGLE_API_KEY and not GEMINI_API_ENDPOINT:
+    logger.warning("GOOGLE_API_KEY is not set; model calls will fail.")
+
+# Configure Gemini once for every caller; GEMINI_API_ENDPOINT points it at a local
+# (e.g. fake) server speaking the REST API
+if GEMINI_API_ENDPOINT:
+    genai.configure(api_key=GOOGLE_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=GOOGLE_API_KEY)
+
+gateway = LLMGateway()
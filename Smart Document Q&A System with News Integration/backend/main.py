@@ -1,13 +1,22 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import json
+import logging
+
+from metrics import configure_logging, setup_observability
+
+# Configure structured logging before the modules below log during import
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Import necessary modules
 from qna import process_document, query_document  # Q&A functionalities
 from news import get_indian_legal_news  # Legal news summarization
-from fact_check import fact_check_legal_claim  # Fact-checking functionality
+from fact_check import fact_check_legal_claim, iter_fact_check  # Fact-checking functionality
 
 app = FastAPI()
 
@@ -20,6 +29,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ✅ Request IDs, timings and Prometheus /metrics
+setup_observability(app)
+
 # ✅ Ensure Upload Directory Exists
 UPLOAD_DIR = "uploaded_docs/"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -29,8 +41,11 @@ def home():
     """API Home Endpoint."""
     return {"message": "Smart Document Q&A System is running with Gemini AI"}
 
+# Handlers that block on extraction, embeddings or the model are plain `def`, so
+# FastAPI runs them in its thread pool instead of stalling the event loop
+
 @app.post("/upload/")
-async def upload_document(file: UploadFile = File(...)):
+def upload_document(file: UploadFile = File(...)):
     """
     Uploads a file, extracts text, and processes embeddings in memory.
     """
@@ -48,7 +63,7 @@ async def upload_document(file: UploadFile = File(...)):
             "content": result["content"],  # Return extracted text for Q&A use
         }
     except Exception as e:
-        print(f"Error processing file: {e}")
+        logger.error(f"Error processing file: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 # ✅ Request Model for Q&A
@@ -58,12 +73,12 @@ class QnARequest(BaseModel):
     document_text: str  # Pass the document content
 
 @app.post("/qna/")
-async def ask_qna(request: QnARequest):
+def ask_qna(request: QnARequest):
     """
     Handles Q&A on legal documents using the document ID and content.
     """
     try:
-        print("Received QnA request:", request.dict())  # Debugging log
+        logger.info(f"Received QnA request for document {request.document_id}")
 
         # Pass the document ID and content to the Q&A function
         response = query_document(request.question, request.document_id, request.document_text)
@@ -75,22 +90,23 @@ async def ask_qna(request: QnARequest):
             "response": response["answer"],
             "source": response.get("source", ""),
             "document_id": response.get("document_id", ""),
+            "usage": response.get("usage", {}),
         }
     except Exception as e:
-        print(f"Error during Q&A: {e}")
+        logger.error(f"Error during Q&A: {e}")
         raise HTTPException(status_code=500, detail=f"Error during Q&A: {str(e)}")
 
 @app.get("/news/")
 def get_legal_news(keywords: Optional[List[str]] = Query(None)):
     """Fetches the latest Indian legal news summaries."""
     try:
-        print(f"Fetching legal news with keywords: {keywords}")
+        logger.info(f"Fetching legal news with keywords: {keywords}")
         # Filter out empty keywords
         filtered_keywords = [k for k in (keywords or []) if k and k.strip()]
         news = get_indian_legal_news(keywords=filtered_keywords)
         return {"news": news or []}
     except Exception as e:
-        print(f"Error fetching legal news: {e}")
+        logger.error(f"Error fetching legal news: {e}")
         return {"news": []}
 
 # ✅ Request Model for Fact-Checking
@@ -98,12 +114,12 @@ class FactCheckRequest(BaseModel):
     claim: str
 
 @app.post("/fact-check/")
-async def fact_check(request: FactCheckRequest):
+def fact_check(request: FactCheckRequest):
     """
     Fact-checks a legal claim using trusted sources.
     """
     try:
-        print("Received Fact-Check request:", request.dict())  # Debugging log
+        logger.info(f"Received Fact-Check request: {request.claim!r}")
 
         # Call the fact_check_legal_claim function from fact_check.py
         response = fact_check_legal_claim(request.claim)
@@ -115,5 +131,23 @@ async def fact_check(request: FactCheckRequest):
         # Return the full response from fact_check_legal_claim
         return response
     except Exception as e:
-        print(f"Error during fact-checking: {e}")
+        logger.error(f"Error during fact-checking: {e}")
         raise HTTPException(status_code=500, detail=f"Error during fact-checking: {str(e)}")
+
+@app.post("/fact-check/stream")
+def fact_check_stream(request: FactCheckRequest):
+    """
+    Fact-checks a legal claim, streaming one NDJSON line per source verdict (with the
+    running summary) as soon as it is ready, then a final "done" line.
+    """
+    logger.info(f"Received streaming Fact-Check request: {request.claim!r}")
+
+    def events():
+        try:
+            for event in iter_fact_check(request.claim):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Error during fact-checking: {e}")
+            yield json.dumps({"event": "error", "detail": f"Error during fact-checking: {str(e)}"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -1,4 +1,3 @@
-import google.generativeai as genai
 import requests
 import feedparser
 from bs4 import BeautifulSoup
@@ -8,6 +7,12 @@ import os
 from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, urljoin
 import re
+import logging
+
+from metrics import instrument, increment
+from llm_gateway import gateway
+
+logger = logging.getLogger(__name__)
 
 # Constants
 CACHE_FILE = "news_cache.json"
@@ -15,16 +20,6 @@ CACHE_EXPIRY = 3600  # 1 hour
 DEFAULT_NEWS_COUNT = 5
 REQUEST_DELAY = 1
 
-# Configure Gemini AI
-try:
-    from config import GOOGLE_API_KEY
-    genai.configure(api_key=GOOGLE_API_KEY)
-    llm_model = genai.GenerativeModel('gemini-1.5-pro')
-    print("Gemini AI configured successfully")
-except Exception as e:
-    print(f"Error configuring Gemini AI: {e}")
-    exit(1)
-
 def clean_html_content(html_content: str) -> str:
     """Clean HTML content and extract plain text."""
     if not html_content:
@@ -39,6 +34,7 @@ def clean_html_content(html_content: str) -> str:
     return text.strip()
 
 
+@instrument("fetch_legal_news")
 def fetch_legal_news():
     """Fetch news from multiple sources."""
     news_sources = [
@@ -67,7 +63,7 @@ def fetch_legal_news():
                     "source": source
                 })
         except Exception as e:
-            print(f"Error fetching from {source}: {e}")
+            logger.error(f"Error fetching from {source}: {e}")
     
     return articles
 
@@ -83,10 +79,10 @@ def summarize_article(title: str, content: str) -> str:
         Title: {title}
         Content: {content[:4000]}
         """
-        response = llm_model.generate_content(prompt)
-        return response.text.strip() if response else content
+        summary = gateway.generate(prompt)
+        return summary.strip() if summary else content
     except Exception as e:
-        print(f"Summarization error for '{title}': {e}")
+        logger.warning(f"Summarization error for '{title}': {e}")
         # Return the original content if summarization fails
         return content[:500] + "..."  # Truncate long content
 
@@ -98,11 +94,14 @@ def get_indian_legal_news(keywords: list[str] | None = None) -> list[dict]:
             with open(CACHE_FILE, 'r', encoding='utf-8') as f:
                 cache = json.load(f)
                 if time.time() - cache.get('timestamp', 0) < CACHE_EXPIRY:
+                    increment("news_cache_hit")
                     return cache['articles']
 
+        if not keywords:
+            increment("news_cache_miss")
         articles = fetch_legal_news()
         if not articles:
-            print("No articles found")
+            logger.warning("No articles found")
             return []
 
         # Filter by keywords if provided
@@ -137,5 +136,5 @@ def get_indian_legal_news(keywords: list[str] | None = None) -> list[dict]:
         return processed_articles
 
     except Exception as e:
-        print(f"Error in get_indian_legal_news: {e}")
+        logger.error(f"Error in get_indian_legal_news: {e}")
         return []
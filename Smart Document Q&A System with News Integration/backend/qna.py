@@ -1,50 +1,93 @@
 import os
-import shutil
+import re
+import json
+import logging
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import faiss
 import numpy as np
-import uuid
 from fastapi import UploadFile
 import pypdf
 import docx
 from PIL import Image
 import pytesseract  # For OCR
 from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import google.generativeai as genai
-from config import GOOGLE_API_KEY
+from text_splitter import LegalTextSplitter
+from config import RETRIEVAL_TOP_K, CONTEXT_TOKEN_BUDGET, DOC_CACHE_DIR, DOC_MEMORY_CACHE_SIZE, DOC_DISK_CACHE_SIZE
+from context_builder import build_context, estimate_tokens
+from metrics import instrument, timed, increment
+from llm_gateway import gateway
 
-# Configure Gemini AI
-genai.configure(api_key=GOOGLE_API_KEY)
-gemini_model = genai.GenerativeModel("gemini-1.5-pro")
+logger = logging.getLogger(__name__)
 
 # Embedding Model
 embedding_model = SentenceTransformer("sentence-transformers/msmarco-distilbert-base-v4")
 embedding_dim = embedding_model.get_sentence_embedding_dimension()
 
-# FAISS Index (In-Memory)
-faiss_index = faiss.IndexFlatL2(embedding_dim)
-
 UPLOAD_DIR = "uploaded_docs/"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(DOC_CACHE_DIR, exist_ok=True)
+
+UPLOAD_READ_BYTES = 1024 * 1024
+DOCUMENT_ID_LENGTH = 12  # Document IDs are a prefix of the content hash
+DOCUMENT_ID_RE = re.compile(rf"^[0-9a-f]{{{DOCUMENT_ID_LENGTH}}}$")
+
+# Processed documents (text, chunks, FAISS index) keyed by content hash, most recent last
+documents = OrderedDict()
+document_hashes = {}  # Document ID -> content hash, for the documents in `documents`
+_registry_lock = threading.Lock()
+_hash_locks = {}  # Content hash -> [lock, holders], only while an upload of that content is in progress
 
 # Set the path to the Tesseract executable
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 
-def save_file(uploaded_file: UploadFile, doc_id: str) -> str:
-    """Save uploaded file to the server with a unique document ID prefix."""
+def save_file(uploaded_file: UploadFile) -> tuple[str, str]:
+    """
+    Stream the upload to disk while hashing it.
+    Files are stored under their SHA-256, so identical bytes are only kept once.
+    Returns the file path and the content hash.
+    """
+    ext = os.path.splitext(uploaded_file.filename or "")[1].lower()
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
     try:
-        filename = f"{doc_id}_{uploaded_file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(uploaded_file.file, buffer)
-        print(f"File saved successfully at: {file_path}")
-        return file_path
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                block = uploaded_file.file.read(UPLOAD_READ_BYTES)
+                if not block:
+                    break
+                digest.update(block)
+                buffer.write(block)
+
+        content_hash = digest.hexdigest()
+        file_path = os.path.join(UPLOAD_DIR, f"{content_hash}{ext}")
+        if os.path.exists(file_path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, file_path)
+        logger.info(f"File saved successfully at: {file_path}")
+        return file_path, content_hash
     except Exception as e:
-        print(f"Error saving file: {e}")
+        logger.error(f"Error saving file: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         raise ValueError("Failed to save the uploaded file.")
 
 
+def _remove_file(file_path: str):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Error deleting file {file_path}: {e}")
+
+
+@instrument("extract_text")
 def extract_text(file_path: str) -> str:
     """Extract text from PDF, DOCX, or image files."""
     ext = file_path.split(".")[-1].lower()
@@ -71,86 +114,280 @@ def extract_text(file_path: str) -> str:
         if not extracted_text.strip():
             raise ValueError("No extractable text found in the file.")
     except Exception as e:
-        print(f"Error extracting text: {e}")
+        logger.error(f"Error extracting text: {e}")
         raise ValueError(f"Failed to extract text: {e}")
 
     return extracted_text.strip()
 
 
+@instrument("split_document")
 def split_document(text: str, chunk_size: int = 1024, chunk_overlap: int = 100):
-    """Splits large legal documents into manageable chunks using LangChain."""
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    """Splits large legal documents into chunks along section and clause boundaries."""
+    splitter = LegalTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     return splitter.split_text(text)
 
 
-def process_document(uploaded_file: UploadFile) -> dict:
-    """Process document and store embeddings only in runtime (not in DB)."""
-    doc_id = str(uuid.uuid4())[:8]  # Generate unique document ID
-    file_path = save_file(uploaded_file, doc_id)
-    extracted_text = extract_text(file_path)
+# --- Document registry ---
+
+def _cache_paths(content_hash: str) -> tuple[str, str]:
+    base = os.path.join(DOC_CACHE_DIR, content_hash)
+    return f"{base}.json", f"{base}.npy"
+
+
+def _id_path(document_id: str) -> str:
+    """File holding the full content hash of a document ID, next to the cached document."""
+    return os.path.join(DOC_CACHE_DIR, f"{document_id}.id")
 
-    if not extracted_text:
-        # Cleanup uploaded file if no text is extracted
+
+def _write_atomic(path: str, write):
+    """Write a cache file through a temp file, so other workers never read it half-written."""
+    fd, temp_path = tempfile.mkstemp(dir=DOC_CACHE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        _remove_file(temp_path)
+        raise
+
+
+def _write_id(content_hash: str):
+    _write_atomic(_id_path(content_hash[:DOCUMENT_ID_LENGTH]), lambda f: f.write(content_hash.encode("utf-8")))
+
+
+@contextmanager
+def _hash_lock(content_hash: str):
+    """Serialise work on one content hash; the lock is dropped once nobody holds or waits for it."""
+    with _registry_lock:
+        entry = _hash_locks.setdefault(content_hash, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _registry_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _hash_locks[content_hash]
+
+
+def _register_document(content_hash: str, text: str, chunks: list, embeddings: np.ndarray) -> dict:
+    """Index a processed document in memory, evicting the least recently used ones."""
+    index = faiss.IndexFlatL2(embedding_dim)
+    index.add(embeddings)
+    document = {
+        "document_id": content_hash[:DOCUMENT_ID_LENGTH],
+        "content_hash": content_hash,
+        "text": text,
+        "chunks": chunks,
+        "index": index,
+    }
+    with _registry_lock:
+        documents[content_hash] = document
+        documents.move_to_end(content_hash)
+        document_hashes[document["document_id"]] = content_hash
+        while len(documents) > DOC_MEMORY_CACHE_SIZE:
+            evicted_hash, evicted = documents.popitem(last=False)
+            if document_hashes.get(evicted["document_id"]) == evicted_hash:
+                del document_hashes[evicted["document_id"]]
+    return document
+
+
+def _store_document(content_hash: str, text: str, chunks: list, embeddings: np.ndarray):
+    """Persist text, chunks and vectors so restarts can reuse them."""
+    meta_path, vectors_path = _cache_paths(content_hash)
+    meta = json.dumps({"text": text, "chunks": chunks}, ensure_ascii=False).encode("utf-8")
+    try:
+        # Vectors first: load_document only trusts a document once its metadata exists
+        _write_atomic(vectors_path, lambda f: np.save(f, embeddings))
+        _write_atomic(meta_path, lambda f: f.write(meta))
+        _write_id(content_hash)
+    except Exception as e:
+        logger.error(f"Error caching document {content_hash}: {e}")
+        return
+    _prune_disk_cache()
+
+
+def _prune_disk_cache():
+    """Delete the oldest cached documents once DOC_CACHE_DIR holds more than DOC_DISK_CACHE_SIZE."""
+    try:
+        with os.scandir(DOC_CACHE_DIR) as entries:
+            cached = [(entry.stat().st_mtime, entry.name[:-len(".json")])
+                      for entry in entries if entry.name.endswith(".json")]
+    except Exception as e:
+        logger.error(f"Error listing the document cache: {e}")
+        return
+    if len(cached) <= DOC_DISK_CACHE_SIZE:
+        return
+    cached.sort()
+    for _, content_hash in cached[:len(cached) - DOC_DISK_CACHE_SIZE]:
+        meta_path, vectors_path = _cache_paths(content_hash)
+        # Metadata first, so a concurrent load_document sees the document as gone, not half there
+        _remove_file(meta_path)
+        _remove_file(vectors_path)
+        id_path = _id_path(content_hash[:DOCUMENT_ID_LENGTH])
+        try:
+            with open(id_path, "r", encoding="utf-8") as f:
+                owner = f.read().strip()
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.error(f"Error reading document ID file {id_path}: {e}")
+            continue
+        if owner == content_hash:
+            _remove_file(id_path)
+
+
+def load_document(content_hash: str) -> dict | None:
+    """Return a processed document from memory or the on-disk cache, if known."""
+    with _registry_lock:
+        document = documents.get(content_hash)
+        if document is not None:
+            documents.move_to_end(content_hash)
+            return document
+
+    meta_path, vectors_path = _cache_paths(content_hash)
+    if not (os.path.exists(meta_path) and os.path.exists(vectors_path)):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        embeddings = np.load(vectors_path)
+    except Exception as e:
+        logger.error(f"Error loading cached document {content_hash}: {e}")
+        return None
+    if embeddings.shape != (len(cached["chunks"]), embedding_dim):
+        logger.warning(f"Ignoring cached document {content_hash}: vectors do not match the embedding model")
+        return None
+    if not os.path.exists(_id_path(content_hash[:DOCUMENT_ID_LENGTH])):
+        # Cached before document IDs were recorded
         try:
-            os.remove(file_path)
+            _write_id(content_hash)
         except Exception as e:
-            print(f"Error deleting file {file_path}: {e}")
-        return {"error": "Document contains no extractable text."}
+            logger.error(f"Error recording document ID for {content_hash}: {e}")
+    return _register_document(content_hash, cached["text"], cached["chunks"], embeddings)
 
-    # Generate embeddings dynamically
-    chunks = split_document(extracted_text)
-    if not chunks:
+
+def get_document(document_id: str) -> dict | None:
+    """Look up a processed document by its exact ID, in memory or in the on-disk cache."""
+    if not DOCUMENT_ID_RE.match(document_id or ""):
+        return None
+    content_hash = document_hashes.get(document_id)
+    if content_hash is None:
+        # Cached by an earlier run or another worker
         try:
-            os.remove(file_path)
+            with open(_id_path(document_id), "r", encoding="utf-8") as f:
+                content_hash = f.read().strip()
+        except FileNotFoundError:
+            return None
         except Exception as e:
-            print(f"Error deleting file {file_path}: {e}")
+            logger.error(f"Error reading document ID {document_id}: {e}")
+            return None
+        if content_hash[:DOCUMENT_ID_LENGTH] != document_id:
+            return None
+    return load_document(content_hash)
+
+
+def index_document(content_hash: str, text: str, persist: bool = True) -> dict:
+    """
+    Split, embed and register a document's text. Returns the document or an error dict.
+    With persist=False the document is only kept in memory, not in DOC_CACHE_DIR.
+    """
+    chunks = split_document(text)
+    if not chunks:
         return {"error": "Document chunking failed; no valid text chunks found."}
 
     try:
-        chunk_embeddings = embedding_model.encode(chunks)
-        global faiss_index
-        faiss_index.reset()  # Clear the FAISS index before adding new embeddings
-        faiss_index.add(np.array(chunk_embeddings, dtype=np.float32))  # In-memory FAISS index
+        with timed("embedding_encode"):
+            chunk_embeddings = np.array(embedding_model.encode(chunks), dtype=np.float32)
     except Exception as e:
-        print(f"Error generating embeddings: {e}")
+        logger.error(f"Error generating embeddings: {e}")
         return {"error": "Failed to generate embeddings for the document."}
 
-    # Cleanup uploaded file after processing
-    try:
-        os.remove(file_path)
-    except Exception as e:
-        print(f"Error deleting file {file_path}: {e}")
+    if persist:
+        _store_document(content_hash, text, chunks, chunk_embeddings)
+    return _register_document(content_hash, text, chunks, chunk_embeddings)
 
-    return {
-        "document_id": doc_id,
-        "message": f"Document '{uploaded_file.filename}' processed successfully.",
-        "content": extracted_text  # Return content for runtime use
-    }
 
+def process_document(uploaded_file: UploadFile) -> dict:
+    """
+    Process an upload and keep its embeddings for Q&A.
+    Content already seen (same bytes) reuses the existing text, chunks and vectors.
+    """
+    file_path, content_hash = save_file(uploaded_file)
+
+    # Serialise concurrent uploads of the same bytes so they are processed once
+    with _hash_lock(content_hash):
+        document = load_document(content_hash)
+        if document is not None:
+            _remove_file(file_path)
+            if not os.path.exists(_cache_paths(content_hash)[0]):
+                # Still indexed in memory but pruned from DOC_CACHE_DIR: persist it again
+                index = document["index"]
+                _store_document(content_hash, document["text"], document["chunks"], index.reconstruct_n(0, index.ntotal))
+            increment("upload_dedup_hit")
+            logger.info(f"Reusing document {document['document_id']} for '{uploaded_file.filename}'")
+            return {
+                "document_id": document["document_id"],
+                "message": f"Document '{uploaded_file.filename}' processed successfully.",
+                "content": document["text"],
+            }
 
-def search_relevant_text(query: str, document_text: str) -> str:
-    """Find the most relevant text chunk dynamically (no DB)."""
-    chunks = split_document(document_text)
-    if not chunks:
-        return ""
+        try:
+            extracted_text = extract_text(file_path)
+        finally:
+            # Cleanup uploaded file after processing
+            _remove_file(file_path)
 
-    chunk_embeddings = embedding_model.encode(chunks)
-    query_embedding = embedding_model.encode([query])[0]
+        if not extracted_text:
+            return {"error": "Document contains no extractable text."}
 
-    if faiss_index.ntotal == 0:
-        return ""
+        document = index_document(content_hash, extracted_text)
+        if "error" in document:
+            return document
+
+    return {
+        "document_id": document["document_id"],
+        "message": f"Document '{uploaded_file.filename}' processed successfully.",
+        "content": extracted_text  # Return content for runtime use
+    }
 
-    distances, indices = faiss_index.search(np.array([query_embedding], dtype=np.float32), k=1)
 
-    # Ensure the index is valid
-    if indices[0][0] < len(chunks):
-        return chunks[indices[0][0]]
-    return ""
+def search_relevant_text(query: str, document_id: str, document_text: str, top_k: int = RETRIEVAL_TOP_K) -> dict:
+    """Retrieve the most relevant chunks and pack them into a token-budgeted context."""
+    document = get_document(document_id)
+    if document is None:
+        if not document_text.strip():
+            return build_context([], CONTEXT_TOKEN_BUDGET)
+        # Unknown ID: index the supplied text under its own hash. It is never bound to
+        # the caller's ID, so later requests for that ID cannot be served this text, and
+        # it stays in memory only: just uploads are written to DOC_CACHE_DIR.
+        text_hash = hashlib.sha256(document_text.encode("utf-8")).hexdigest()
+        with _hash_lock(text_hash):
+            document = load_document(text_hash) or index_document(text_hash, document_text, persist=False)
+        if "error" in document:
+            return build_context([], CONTEXT_TOKEN_BUDGET)
+
+    chunks = document["chunks"]
+    index = document["index"]
+    if not chunks or index.ntotal == 0:
+        return build_context([], CONTEXT_TOKEN_BUDGET)
+
+    with timed("embedding_encode"):
+        query_embedding = embedding_model.encode([query])[0]
+    k = min(top_k, index.ntotal)
+    with timed("faiss_search"):
+        distances, indices = index.search(np.array([query_embedding], dtype=np.float32), k=k)
+
+    # FAISS returns hits ordered by distance; skip padding entries
+    ranked_chunks = [chunks[i] for i in indices[0] if 0 <= i < len(chunks)]
+    return build_context(ranked_chunks, CONTEXT_TOKEN_BUDGET)
 
 
 def query_document(question: str, document_id: str, document_text: str) -> dict:
     """Ask a question about a document using Gemini AI."""
-    relevant_text = search_relevant_text(question, document_text)
+    context = search_relevant_text(question, document_id, document_text)
+    relevant_text = context["text"]
 
     if not relevant_text:
         return {"error": "No relevant information found in the document."}
@@ -164,18 +401,26 @@ def query_document(question: str, document_id: str, document_text: str) -> dict:
 
     Question: {question}
     """
+    usage = {
+        "context_tokens": context["tokens"],
+        "prompt_tokens": estimate_tokens(prompt),
+        "chunks_used": len(context["chunks"]),
+        "chunks_dropped": context["dropped"],
+    }
+    logger.info(f"Prompt usage for document {document_id}: {usage}")
 
     try:
-        response = gemini_model.generate_content(prompt)
-        if response and hasattr(response, "text"):
+        answer = gateway.generate(prompt)
+        if answer:
             return {
                 "question": question,
-                "answer": response.text,
+                "answer": answer,
                 "source": relevant_text,  # Include the relevant text as the source
-                "document_id": document_id  # Include the document ID in the response
+                "document_id": document_id,  # Include the document ID in the response
+                "usage": usage,
             }
         else:
             return {"error": "No response generated by the AI."}
     except Exception as e:
-        print(f"Error during AI processing: {e}")
+        logger.error(f"Error during AI processing: {e}")
         return {"error": f"AI processing failed: {e}"}
\ No newline at end of file
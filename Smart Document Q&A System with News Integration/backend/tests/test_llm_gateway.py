@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from llm_gateway import CircuitBreaker, CircuitOpenError, LLMGateway, QueueTimeoutError
+
+COOLDOWN = 0.05
+
+
+class ServiceUnavailable(Exception):
+    """Named like the google.api_core error, so the gateway treats it as retryable."""
+
+
+def fail():
+    raise ServiceUnavailable("503")
+
+
+def answer():
+    return "ok"
+
+
+def test_breaker_opens_after_threshold_and_closes_after_successful_trial():
+    breaker = CircuitBreaker(threshold=2, cooldown=COOLDOWN)
+    assert breaker.state == "closed"
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(COOLDOWN)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one trial at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(threshold=1, cooldown=COOLDOWN)
+    breaker.record_failure()
+    time.sleep(COOLDOWN)
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_released_trial_lets_the_next_call_try():
+    breaker = CircuitBreaker(threshold=1, cooldown=COOLDOWN)
+    breaker.record_failure()
+    time.sleep(COOLDOWN)
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_queue_timeout_during_half_open_trial_does_not_wedge_the_circuit():
+    gateway = LLMGateway(max_concurrency=1, max_retries=0, breaker_threshold=1,
+                         breaker_cooldown=COOLDOWN, hedge=False)
+    with pytest.raises(ServiceUnavailable):
+        gateway.call("model", fail)
+    with pytest.raises(CircuitOpenError):
+        gateway.call("model", answer)
+
+    time.sleep(COOLDOWN)
+    channel = gateway._channel("model")
+    channel.slots.acquire()  # An abandoned attempt still holds the only slot
+    try:
+        with pytest.raises(QueueTimeoutError):
+            gateway.call("model", answer, timeout=0.05)
+    finally:
+        channel.slots.release()
+
+    assert gateway.call("model", answer) == "ok"
+    assert channel.breaker.state == "closed"
+
+
+def test_interrupted_trial_is_released():
+    gateway = LLMGateway(max_concurrency=1, max_retries=0, breaker_threshold=1,
+                         breaker_cooldown=COOLDOWN, hedge=False)
+    with pytest.raises(ServiceUnavailable):
+        gateway.call("model", fail)
+    time.sleep(COOLDOWN)
+
+    class Interrupted(BaseException):
+        pass
+
+    def interrupt():
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        gateway.call("model", interrupt)
+    assert gateway.call("model", answer) == "ok"
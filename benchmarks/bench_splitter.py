@@ -0,0 +1,107 @@
+"""
+Throughput benchmark: LegalTextSplitter vs LangChain's RecursiveCharacterTextSplitter.
+
+Page text is extracted once from the PDFs in AI_Powered_Legal_Chatbot/backend/Data
+(not timed), then each splitter chunks every document and the best of `--repeat`
+runs is reported, using the ingestion settings (1000 characters, 200 overlap). Besides speed the report counts
+chunks and how many of them end mid-sentence, which is what drives the number of
+chunks retrieval needs per answer.
+
+Usage (from the repository root):
+    python benchmarks/bench_splitter.py --output benchmarks/results/splitter.json
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import pypdf
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CHATBOT_DIR = REPO_ROOT / "AI_Powered_Legal_Chatbot" / "backend"
+sys.path.insert(0, str(CHATBOT_DIR))
+
+from app.utils.text_splitter import LegalTextSplitter  # noqa: E402
+
+CLEAN_END_RE = re.compile(r"[.;:?!)\]\"'—-]\s*$")
+
+
+def load_pages(data_dir: Path) -> dict:
+    documents = {}
+    for path in sorted(data_dir.iterdir()):
+        if path.suffix.lower() != ".pdf":
+            continue
+        reader = pypdf.PdfReader(str(path))
+        documents[path.name] = [page.extract_text() or "" for page in reader.pages]
+    return documents
+
+
+def run(name: str, split, documents: dict, repeat: int) -> dict:
+    total_chars = sum(len("\n".join(pages)) for pages in documents.values())
+    chunks = []
+    elapsed = float("inf")
+    # Best of `repeat` runs, after one warm-up pass
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        chunks = [chunk for pages in documents.values() for chunk in split(pages)]
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    clean_ends = sum(1 for chunk in chunks if CLEAN_END_RE.search(chunk))
+    return {
+        "splitter": name,
+        "chunks": len(chunks),
+        "mean_chunk_chars": round(sum(map(len, chunks)) / len(chunks), 1) if chunks else 0.0,
+        "max_chunk_chars": max(map(len, chunks)) if chunks else 0,
+        "clean_end_ratio": round(clean_ends / len(chunks), 4) if chunks else 0.0,
+        "seconds": round(elapsed, 4),
+        "mb_per_s": round(total_chars / 1e6 / elapsed, 3) if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=str(CHATBOT_DIR / "Data"))
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", default="")
+    args = parser.parse_args(argv)
+
+    print(f"Extracting page text from {args.data_dir} ...")
+    documents = load_pages(Path(args.data_dir))
+    total_chars = sum(len("\n".join(pages)) for pages in documents.values())
+    print(f"{len(documents)} documents, {total_chars / 1e6:.2f} M characters")
+
+    legal = LegalTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    results = [run("legal", lambda pages: [c["text"] for c in legal.iter_chunks(pages)], documents, args.repeat)]
+
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    except ImportError:
+        print("LangChain is not installed; skipping RecursiveCharacterTextSplitter.")
+    else:
+        recursive = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+        results.append(run("recursive", lambda pages: recursive.split_text("\n".join(pages)), documents, args.repeat))
+
+    for result in results:
+        print(f"{result['splitter']:<10} {result['mb_per_s']:>8.2f} MB/s  {result['seconds']:>7.3f} s  "
+              f"{result['chunks']:>6} chunks  mean {result['mean_chunk_chars']:>6.0f} chars  "
+              f"clean ends {100 * result['clean_end_ratio']:.1f}%")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "config": {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap, "repeat": args.repeat},
+            "characters": total_chars,
+            "documents": len(documents),
+            "results": results,
+        }
+        output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
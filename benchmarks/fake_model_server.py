@@ -0,0 +1,147 @@
+"""
+Local stand-in for the Gemini REST API (`POST /v1beta/models/<model>:generateContent`).
+
+Answers come from `fakes.fake_completion`, so they take the configured fake LLM
+latency, and the server can inject the failure modes the LLM gateway is built
+for: rate limits and unavailability (`--error-rate`, answered as 429 or 503) and
+a slow tail (`--slow-rate` requests take an extra `--slow-latency` seconds).
+Responses carry `usageMetadata` so token accounting can be checked.
+
+Point a backend at it with GEMINI_API_ENDPOINT=http://127.0.0.1:8765, or let the
+load test start one in-process with `--model-server`.
+
+Usage (from the repository root):
+    python benchmarks/fake_model_server.py --port 8765 --error-rate 0.05 --slow-rate 0.05
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fakes
+
+GENERATE_PATH_RE = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):generateContent")
+
+ERRORS = [
+    (429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota)."),
+    (503, "UNAVAILABLE", "The model is overloaded. Please try again later."),
+]
+
+
+class FakeModelServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, error_rate: float = 0.0, slow_rate: float = 0.0,
+                 slow_latency: float = 5.0, seed: int = 0):
+        super().__init__(address, _Handler)
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "errors": 0, "slow": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self) -> tuple[tuple | None, bool]:
+        """Pick (error to return or None, whether to be slow) for the next request, repeatably."""
+        with self._lock:
+            self.counts["requests"] += 1
+            if self._rng.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return ERRORS[self.counts["errors"] % len(ERRORS)], False
+            slow = self._rng.random() < self.slow_rate
+            self.counts["slow"] += slow
+            return None, slow
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeModelServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        match = GENERATE_PATH_RE.match(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        error, slow = self.server.draw()
+        if error:
+            code, status, message = error
+            self._send_json(code, {"error": {"code": code, "message": message, "status": status}})
+            return
+        if slow:
+            time.sleep(self.server.slow_latency)
+
+        prompt = "\n".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = fakes.fake_completion(prompt)
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(text) // 4)
+        self._send_json(200, {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": completion_tokens,
+                "totalTokenCount": prompt_tokens + completion_tokens,
+            },
+            "modelVersion": match.group("model"),
+        })
+
+
+def start(host: str = "127.0.0.1", port: int = 0, **options) -> FakeModelServer:
+    """Serve in a background thread; `port=0` picks a free port (see `server.url`)."""
+    server = FakeModelServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-model-server", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.8, help="Seconds per answer")
+    parser.add_argument("--jitter", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 429/503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    fakes.LATENCY["llm"] = fakes.Latency(args.latency, args.jitter)
+    server = FakeModelServer((args.host, args.port), error_rate=args.error_rate, slow_rate=args.slow_rate,
+                             slow_latency=args.slow_latency, seed=args.seed)
+    print(f"Fake Gemini API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Deterministic local stand-ins for the remote services used by both backends.
+
+`install_fakes()` must run before the backend modules are imported. It replaces
+`google.generativeai`, `langchain_google_genai` and `sentence_transformers` with
+in-process fakes, routes every `requests` call and `feedparser.parse` URL through
+canned DuckDuckGo / legal-site / Google News responses, and records the latency
+of every faked call in `STAGES` so the load test can report it per stage. Given
+the URL of a `fake_model_server.py`, model calls go to it over HTTP instead.
+"""
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, urlparse
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+EMBEDDING_DIM = 768
+
+_WORD_RE = re.compile(r"\w+")
+_NUMBERED_LINE_RE = re.compile(r"^\d+\. ", re.M)
+
+
+class Latency:
+    """Simulated service latency: `base` seconds plus up to `jitter` seconds."""
+
+    def __init__(self, base: float = 0.0, jitter: float = 0.0, per_item: float = 0.0):
+        self.base = base
+        self.jitter = jitter
+        self.per_item = per_item
+
+    def sleep(self, key: str, items: int = 1):
+        # Jitter is derived from the input so repeated runs see identical delays
+        rng = random.Random(_stable_hash(key))
+        delay = self.base + self.per_item * items + rng.random() * self.jitter
+        if delay > 0:
+            time.sleep(delay)
+
+
+class StageRecorder:
+    """Thread-safe collection of per-stage call durations (seconds)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+
+    def samples(self) -> dict:
+        with self._lock:
+            return {stage: list(values) for stage, values in self._samples.items()}
+
+
+STAGES = StageRecorder()
+
+LATENCY = {
+    "llm": Latency(base=0.8, jitter=0.4),
+    "embedding": Latency(base=0.05, jitter=0.02, per_item=0.002),
+    "http": Latency(base=0.15, jitter=0.1),
+}
+
+
+class _timed:
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGES.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# --- Language model ---
+
+FACT_CHECK_STATUSES = ["Supports", "Supports", "Contradicts", "Irrelevant"]
+
+
+def fake_completion(prompt: str) -> str:
+    """Produce a deterministic answer shaped like what the caller expects."""
+    LATENCY["llm"].sleep(prompt)
+    digest = _stable_hash(prompt)
+
+    if '"status"' in prompt:
+        status = FACT_CHECK_STATUSES[digest % len(FACT_CHECK_STATUSES)]
+        return "```json\n" + json.dumps({
+            "status": status,
+            "reasoning": "Benchmark stand-in verdict.",
+            "quote": "",
+        }) + "\n```"
+
+    words = _WORD_RE.findall(prompt)
+    if '"answers"' in prompt:
+        # Several numbered questions answered together, one JSON answer each
+        count = len(_NUMBERED_LINE_RE.findall(prompt.split("QUESTIONS:")[-1]))
+        return json.dumps({"answers": [
+            "Based on the provided context, " + " ".join(words[(digest + n * 7919 + i) % len(words)] for i in range(40)) + "."
+            for n in range(count)
+        ]})
+
+    picked = [words[(digest + i * 7919) % len(words)] for i in range(min(40, len(words)))] if words else []
+    return "Based on the provided context, " + " ".join(picked) + "."
+
+
+# Base URL of a fake_model_server.py instance; when set, model calls go over HTTP
+MODEL_SERVER = {"url": None}
+
+
+class FakeAPIError(Exception):
+    """Error answer from the model server, with the HTTP status as `code` like google.api_core errors."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeUsageMetadata:
+    def __init__(self, prompt_token_count: int = 0, candidates_token_count: int = 0):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeGenerateContentResponse:
+    def __init__(self, text: str, usage_metadata: FakeUsageMetadata | None = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def remote_completion(model: str, prompt: str, timeout: float | None = None) -> FakeGenerateContentResponse:
+    """Ask the fake model server over HTTP, as the real REST transport would."""
+    response = requests.post(
+        f"{MODEL_SERVER['url']}/v1beta/models/{model}:generateContent",
+        json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+        timeout=timeout,
+    )
+    payload = response.json()
+    if response.status_code >= 400:
+        raise FakeAPIError(response.status_code, payload.get("error", {}).get("message", ""))
+    usage = payload.get("usageMetadata", {})
+    return FakeGenerateContentResponse(
+        payload["candidates"][0]["content"]["parts"][0]["text"],
+        FakeUsageMetadata(usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0)),
+    )
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name: str = "gemini-1.5-pro", **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, request_options=None, **kwargs):
+        with _timed("llm.generate_content"):
+            prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+            if MODEL_SERVER["url"]:
+                return remote_completion(self.model_name, prompt, (request_options or {}).get("timeout"))
+            return FakeGenerateContentResponse(fake_completion(prompt))
+
+
+def _build_genai_module() -> types.ModuleType:
+    module = types.ModuleType("google.generativeai")
+    module.configure = lambda **kwargs: None
+    module.GenerativeModel = FakeGenerativeModel
+    return module
+
+
+# --- Embeddings ---
+
+def fake_embed(texts: list[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Hashing-trick bag-of-words vectors: similar texts get similar vectors."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in _WORD_RE.findall(text.lower()):
+            vectors[row, _stable_hash(word) % dim] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class FakeSentenceTransformer:
+    def __init__(self, model_name_or_path: str = "", **kwargs):
+        self.model_name = model_name_or_path
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return EMBEDDING_DIM
+
+    def encode(self, sentences, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        with _timed("embedding.encode"):
+            LATENCY["embedding"].sleep("|".join(texts[:1]), items=len(texts))
+            vectors = fake_embed(texts)
+        return vectors[0] if single else vectors
+
+    def start_multi_process_pool(self, target_devices=None):
+        # Threads stand in for the worker processes: the fake encoder only sleeps
+        return {"workers": len(target_devices or ["cpu"] * 4)}
+
+    def encode_multi_process(self, sentences, pool, batch_size: int = 32, **kwargs):
+        texts = list(sentences)
+        size = max(1, -(-len(texts) // pool["workers"]))
+        with ThreadPoolExecutor(max_workers=pool["workers"]) as executor:
+            parts = list(executor.map(self.encode, [texts[i:i + size] for i in range(0, len(texts), size)]))
+        return np.vstack(parts) if parts else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    @staticmethod
+    def stop_multi_process_pool(pool):
+        pass
+
+
+def _build_sentence_transformers_module() -> types.ModuleType:
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeSentenceTransformer
+    return module
+
+
+def _build_langchain_google_genai_module() -> types.ModuleType:
+    # Imported lazily so the Q&A backend can be benchmarked without LangChain
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.chat_models import SimpleChatModel
+
+    class FakeGoogleGenerativeAIEmbeddings(Embeddings):
+        def __init__(self, model: str = "models/embedding-001", **kwargs):
+            self.model = model
+
+        def embed_documents(self, texts, **kwargs):
+            with _timed("embedding.embed_documents"):
+                LATENCY["embedding"].sleep("|".join(texts[:1]), items=len(texts))
+                return fake_embed(texts).tolist()
+
+        def embed_query(self, text):
+            with _timed("embedding.embed_query"):
+                LATENCY["embedding"].sleep(text)
+                return fake_embed([text])[0].tolist()
+
+    class FakeChatGoogleGenerativeAI(SimpleChatModel):
+        model: str = "gemini-1.5-pro"
+        temperature: float = 0.7
+        google_api_key: str | None = None
+        max_retries: int = 6
+        timeout: float | None = None
+        transport: str | None = None
+        client_options: dict | None = None
+
+        @property
+        def _llm_type(self) -> str:
+            return "fake-gemini"
+
+        def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+            with _timed("llm.chat"):
+                prompt = "\n".join(str(message.content) for message in messages)
+                if MODEL_SERVER["url"]:
+                    return remote_completion(self.model, prompt, self.timeout).text
+                return fake_completion(prompt)
+
+    module = types.ModuleType("langchain_google_genai")
+    module.GoogleGenerativeAIEmbeddings = FakeGoogleGenerativeAIEmbeddings
+    module.ChatGoogleGenerativeAI = FakeChatGoogleGenerativeAI
+    return module
+
+
+# --- HTTP sources ---
+
+LEGAL_PAGE_TEXT = (
+    "Section {n} of the Indian Penal Code, 1860 provides that whoever commits the offence "
+    "shall be punished with imprisonment of either description for a term which may extend "
+    "to {years} years, or with fine, or with both. The Supreme Court has held that the "
+    "provision must be read with the procedure laid down in the Code of Criminal Procedure, 1973. "
+)
+
+
+def _fake_duckduckgo_html(query: str) -> str:
+    match = re.search(r"site:(\S+)", query)
+    site = match.group(1) if match else "indiankanoon.org"
+    digest = _stable_hash(query)
+    links = []
+    for i in range(3):
+        target = f"https://{site}/doc/{(digest + i) % 100000}/"
+        links.append(
+            f'<a class="result__a" href="//duckduckgo.com/y.js?uddg={quote(target, safe="")}">Result {i}</a>'
+        )
+    return "<html><body>" + "".join(links) + "</body></html>"
+
+
+def _fake_legal_page_html(url: str) -> str:
+    digest = _stable_hash(url)
+    body = "".join(
+        LEGAL_PAGE_TEXT.format(n=100 + (digest + i) % 400, years=1 + (digest + i) % 10) for i in range(12)
+    )
+    return f"<html><body><main><h1>Judgment {digest % 1000}</h1><p>{body}</p></main></body></html>"
+
+
+def _fake_rss(url: str) -> str:
+    digest = _stable_hash(url)
+    items = []
+    for i in range(10):
+        n = (digest + i) % 1000
+        items.append(
+            f"<item><title>Supreme Court ruling on Section {n} bail plea - LiveLaw</title>"
+            f"<link>https://news.example.org/article/{n}</link>"
+            f"<description>&lt;p&gt;The court examined the scope of Section {n} and the "
+            f"right to bail under Article 21 of the Constitution.&lt;/p&gt;</description></item>"
+        )
+    return f"<?xml version='1.0'?><rss version='2.0'><channel><title>Legal</title>{''.join(items)}</channel></rss>"
+
+
+_original_send = HTTPAdapter.send
+
+
+def _fake_send(adapter, request, **kwargs):
+    """Drop-in for `HTTPAdapter.send` that answers locally instead of opening a socket."""
+    parsed = urlparse(request.url)
+    host = parsed.netloc
+    if MODEL_SERVER["url"] and request.url.startswith(MODEL_SERVER["url"]):
+        return _original_send(adapter, request, **kwargs)
+    if "duckduckgo.com" in host:
+        stage = "http.duckduckgo"
+        body = _fake_duckduckgo_html(parse_qs(parsed.query).get("q", [""])[0])
+    elif "news.google.com" in host:
+        stage = "http.google_news"
+        body = _fake_rss(request.url)
+    else:
+        stage = "http.source_page"
+        body = _fake_legal_page_html(request.url)
+
+    with _timed(stage):
+        LATENCY["http"].sleep(request.url)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict({"Content-Type": "text/html; charset=utf-8"})
+        response._content = body.encode("utf-8")
+        return response
+
+
+def _install_http_fakes():
+    HTTPAdapter.send = _fake_send
+
+    try:
+        import feedparser
+    except ImportError:
+        return
+    original_parse = feedparser.parse
+
+    def parse(url_file_stream_or_string, *args, **kwargs):
+        if isinstance(url_file_stream_or_string, str) and url_file_stream_or_string.startswith("http"):
+            with _timed("http.google_news"):
+                LATENCY["http"].sleep(url_file_stream_or_string)
+                url_file_stream_or_string = _fake_rss(url_file_stream_or_string)
+        return original_parse(url_file_stream_or_string, *args, **kwargs)
+
+    feedparser.parse = parse
+
+
+def install_fakes(llm: Latency | None = None, embedding: Latency | None = None, http: Latency | None = None,
+                  model_server: str | None = None):
+    """
+    Swap the remote services for local fakes. Call before importing the backends.
+    With `model_server` (a fake_model_server.py URL) model calls are sent there over HTTP.
+    """
+    MODEL_SERVER["url"] = model_server
+    if llm is not None:
+        LATENCY["llm"] = llm
+    if embedding is not None:
+        LATENCY["embedding"] = embedding
+    if http is not None:
+        LATENCY["http"] = http
+
+    if "google" not in sys.modules:
+        try:
+            import google  # noqa: F401 - namespace package from protobuf et al.
+        except ImportError:
+            sys.modules["google"] = types.ModuleType("google")
+    genai = _build_genai_module()
+    sys.modules["google.generativeai"] = genai
+    sys.modules["google"].generativeai = genai
+
+    sys.modules["sentence_transformers"] = _build_sentence_transformers_module()
+    try:
+        sys.modules["langchain_google_genai"] = _build_langchain_google_genai_module()
+    except ImportError:
+        pass
+
+    _install_http_fakes()
+
+
+def synthetic_legal_corpus(size: int = 300) -> list[str]:
+    """Statute-like passages used to build the chatbot's vector store offline."""
+    passages = []
+    for i in range(size):
+        passages.append(
+            f"Chapter {i // 25 + 1}. Section {i + 1}. "
+            + LEGAL_PAGE_TEXT.format(n=i + 1, years=1 + i % 10)
+            + f"Explanation {i % 3 + 1}: the term 'public servant' in section {i + 1} includes officers of the State."
+        )
+    return passages
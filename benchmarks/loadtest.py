@@ -0,0 +1,420 @@
+"""
+Offline end-to-end load test for both backends.
+
+Remote services (Gemini, Google embeddings, sentence-transformers, DuckDuckGo,
+legal source sites and Google News) are replaced by the deterministic fakes in
+`fakes.py`, then every endpoint is driven in-process over ASGI at a fixed
+concurrency. Results are written as JSON with stable key order so runs from two
+commits can be diffed directly.
+
+Usage (from the repository root):
+    python benchmarks/loadtest.py --concurrency 8 --requests 40 --output benchmarks/results/head.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+import fakes
+import fake_model_server
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DOCQA_DIR = REPO_ROOT / "Smart Document Q&A System with News Integration" / "backend"
+CHATBOT_DIR = REPO_ROOT / "AI_Powered_Legal_Chatbot" / "backend"
+DEFAULT_UPLOAD = CHATBOT_DIR / "Data" / "Ankit_Bharti_vs_State_Of_U_P_And_Another_on_2_March_2020.PDF"
+
+QUESTIONS = [
+    "What is the punishment for cheating under the Indian Penal Code?",
+    "Can the High Court quash criminal proceedings after a compromise?",
+    "What does Section 482 of the Code of Criminal Procedure provide?",
+    "Which offences are non-compoundable?",
+    "What did the court decide about the complainant's application?",
+]
+
+CLAIMS = [
+    "Section 124A of the Indian Penal Code deals with sedition.",
+    "Section 302 IPC prescribes the punishment for murder.",
+    "The High Court cannot quash an FIR under Section 482 CrPC.",
+    "The GST rate on restaurant food is 5 percent.",  # Not in the local corpus: falls back to the web
+]
+
+# Compliance-style checklist for /api/query/batch: several questions about each section
+CHECKLIST_TEMPLATES = [
+    "What does Section {n} of the Indian Penal Code provide?",
+    "What is the punishment under Section {n} of the Indian Penal Code?",
+    "Does the term public servant in Section {n} include officers of the State?",
+    "Which procedure applies to an offence under Section {n}?",
+]
+
+NEWS_KEYWORDS = ["court", "bail", "section", ""]
+
+ENDPOINTS = {
+    "docqa": ["upload", "qna", "news", "fact-check", "fact-check-stream"],
+    "chatbot": ["query", "query-batch"],
+}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], wall_seconds: float | None = None, errors: int = 0) -> dict:
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "mean_ms": round(1000 * sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 50), 2),
+        "p95_ms": round(1000 * percentile(values, 95), 2),
+        "p99_ms": round(1000 * percentile(values, 99), 2),
+        "max_ms": round(1000 * values[-1], 2) if values else 0.0,
+    }
+    if wall_seconds is not None:
+        summary["errors"] = errors
+        summary["wall_s"] = round(wall_seconds, 3)
+        summary["throughput_rps"] = round(len(values) / wall_seconds, 3) if wall_seconds else 0.0
+    return summary
+
+
+async def drive(make_request, total: int, concurrency: int) -> dict:
+    """Issue `total` requests with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await make_request(i)
+                failed = response.status_code >= 400
+            except Exception as e:
+                print(f"  request {i} failed: {e}")
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    fakes.STAGES.reset()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - wall_start
+
+    result = summarize(latencies, wall, errors)
+    result["stages"] = {
+        stage: summarize(samples) for stage, samples in sorted(fakes.STAGES.samples().items())
+    }
+    return result
+
+
+def serve(app) -> str:
+    """
+    Serve `app` with uvicorn on a free local port in a background thread. Streaming
+    endpoints are measured this way because httpx's ASGI transport buffers whole bodies.
+    """
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    host, port = sock.getsockname()
+    return f"http://{host}:{port}"
+
+
+def import_docqa():
+    sys.path.insert(0, str(DOCQA_DIR))
+    import main
+    return main.app
+
+
+def import_chatbot():
+    # qa_service loads the "Database" vector store from the working directory at import,
+    # so it is built first with the embeddings EMBEDDING_PROVIDER selects
+    from langchain_community.vectorstores import FAISS
+
+    sys.path.insert(0, str(CHATBOT_DIR))
+    from app.services.embedding_provider import get_embeddings, save_vector_store
+
+    embeddings = get_embeddings()
+    save_vector_store(FAISS.from_texts(fakes.synthetic_legal_corpus(), embeddings), "Database", embeddings)
+
+    from app.main import app
+    return app
+
+
+async def bench_docqa(app, args, endpoints: list[str]) -> dict:
+    results = {}
+    upload_bytes = Path(args.upload_file).read_bytes()
+    upload_name = Path(args.upload_file).name
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        def upload(i):
+            files = {"file": (upload_name, upload_bytes, "application/pdf")}
+            return client.post("/upload/", files=files)
+
+        if "upload" in endpoints:
+            print("[docqa] POST /upload/")
+            results["POST /upload/"] = await drive(upload, args.requests, args.concurrency)
+
+        if "qna" in endpoints:
+            document = (await upload(0)).json()
+
+            def qna(i):
+                return client.post("/qna/", json={
+                    "question": QUESTIONS[i % len(QUESTIONS)],
+                    "document_id": document["document_id"],
+                    "document_text": document["content"],
+                })
+
+            print("[docqa] POST /qna/")
+            results["POST /qna/"] = await drive(qna, args.requests, args.concurrency)
+
+        if "news" in endpoints:
+            def news(i):
+                keyword = NEWS_KEYWORDS[i % len(NEWS_KEYWORDS)]
+                return client.get("/news/", params={"keywords": keyword} if keyword else None)
+
+            print("[docqa] GET /news/")
+            results["GET /news/"] = await drive(news, args.requests, args.concurrency)
+
+        if "fact-check" in endpoints:
+            # Wait for the local legal corpus (built once, then cached) so runs are comparable
+            sys.modules["fact_check"].legal_corpus.load()
+
+            def fact_check(i):
+                return client.post("/fact-check/", json={"claim": CLAIMS[i % len(CLAIMS)]})
+
+            print("[docqa] POST /fact-check/")
+            results["POST /fact-check/"] = await drive(fact_check, args.fact_check_requests, args.concurrency)
+
+    if "fact-check-stream" in endpoints:
+        sys.modules["fact_check"].legal_corpus.load()
+        first_verdicts = []
+        stopped_early = 0
+
+        async with httpx.AsyncClient(base_url=serve(app), timeout=None) as client:
+            async def fact_check_stream(i):
+                nonlocal stopped_early
+                start = time.perf_counter()
+                first = None
+                async with client.stream("POST", "/fact-check/stream",
+                                         json={"claim": CLAIMS[i % len(CLAIMS)]}) as response:
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if event["event"] == "verdict" and first is None:
+                            first = time.perf_counter() - start
+                            first_verdicts.append(first)
+                        elif event["event"] == "done":
+                            stopped_early += event["stopped_early"]
+                return response
+
+            print("[docqa] POST /fact-check/stream")
+            result = await drive(fact_check_stream, args.fact_check_requests, args.concurrency)
+            result["first_verdict"] = summarize(first_verdicts)
+            result["stopped_early"] = stopped_early
+            results["POST /fact-check/stream"] = result
+
+    return results
+
+
+async def bench_chatbot(app, args, endpoints: list[str]) -> dict:
+    results = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        if "query" in endpoints:
+            def query(i):
+                return client.post("/api/query", json={"question": QUESTIONS[i % len(QUESTIONS)]})
+
+            print("[chatbot] POST /api/query")
+            results["POST /api/query"] = await drive(query, args.requests, args.concurrency)
+
+    if "query-batch" in endpoints:
+        questions = [
+            CHECKLIST_TEMPLATES[i % len(CHECKLIST_TEMPLATES)].format(n=1 + i // len(CHECKLIST_TEMPLATES))
+            for i in range(args.batch_size)
+        ]
+        first_answers = []
+        counts = {"answered": 0, "failed": 0}
+
+        async with httpx.AsyncClient(base_url=serve(app), timeout=None) as client:
+            async def query_batch(i):
+                start = time.perf_counter()
+                async with client.stream("POST", "/api/query/batch", json={"questions": questions}) as response:
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        item = json.loads(line)
+                        if not first_answers:
+                            first_answers.append(time.perf_counter() - start)
+                        counts["answered" if "answer" in item else "failed"] += 1
+                return response
+
+            calls_before = model_calls("app.services.llm_gateway")
+            print(f"[chatbot] POST /api/query/batch ({len(questions)} questions)")
+            result = await drive(query_batch, 1, 1)
+            result.update(counts)
+            result["questions"] = len(questions)
+            result["questions_per_s"] = round(counts["answered"] / result["wall_s"], 3) if result["wall_s"] else 0.0
+            result["first_answer"] = summarize(first_answers)
+            result["llm_calls"] = model_calls("app.services.llm_gateway") - calls_before
+            results["POST /api/query/batch"] = result
+
+    return results
+
+
+def gateway_stats(module_name: str) -> dict:
+    """LLM gateway counters of an imported backend, if it has one."""
+    module = sys.modules.get(module_name)
+    return module.gateway.stats() if module is not None else {}
+
+
+def model_calls(module_name: str) -> int:
+    """Model calls made so far through a backend's LLM gateway."""
+    return sum(model["calls"] for model in gateway_stats(module_name).values())
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", default="docqa,chatbot", help="Comma-separated: docqa, chatbot")
+    parser.add_argument("--endpoints", default="", help="Comma-separated subset, e.g. upload,qna,query")
+    parser.add_argument("-n", "--requests", type=int, default=20, help="Requests per endpoint")
+    parser.add_argument("--fact-check-requests", type=int, default=3,
+                        help="Requests for /fact-check/, which is much slower than the others")
+    parser.add_argument("--web-only", action="store_true",
+                        help="Fact-check without the local legal corpus, so every claim goes to the web")
+    parser.add_argument("--embedding-provider", choices=["google", "local"], default="google",
+                        help="Chatbot embeddings: the Google API fake or the local sentence-transformer fake")
+    parser.add_argument("--batch-size", type=int, default=100, help="Questions in the /api/query/batch checklist")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Seconds per fake LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.4)
+    parser.add_argument("--model-server", action="store_true",
+                        help="Serve the fake LLM over HTTP (fake_model_server.py) instead of in-process")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0,
+                        help="With --model-server: share of model calls answered 429/503")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0,
+                        help="With --model-server: share of model calls delayed by --llm-slow-latency")
+    parser.add_argument("--llm-slow-latency", type=float, default=5.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per fake embedding call")
+    parser.add_argument("--embedding-per-item", type=float, default=0.002)
+    parser.add_argument("--http-latency", type=float, default=0.15, help="Seconds per fake HTTP request")
+    parser.add_argument("--http-jitter", type=float, default=0.1)
+    parser.add_argument("--upload-file", default=str(DEFAULT_UPLOAD))
+    parser.add_argument("-o", "--output", default=str(REPO_ROOT / "benchmarks" / "results" / "latest.json"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    apps = [a.strip() for a in args.apps.split(",") if a.strip()]
+    wanted = {e.strip() for e in args.endpoints.split(",") if e.strip()}
+    output = Path(args.output).resolve()
+    args.upload_file = str(Path(args.upload_file).resolve())
+
+    model_server = None
+    if args.model_server:
+        model_server = fake_model_server.start(
+            error_rate=args.llm_error_rate, slow_rate=args.llm_slow_rate, slow_latency=args.llm_slow_latency,
+        )
+        os.environ["GEMINI_API_ENDPOINT"] = model_server.url
+    fakes.install_fakes(
+        llm=fakes.Latency(args.llm_latency, args.llm_jitter),
+        embedding=fakes.Latency(args.embedding_latency, 0.0, args.embedding_per_item),
+        http=fakes.Latency(args.http_latency, args.http_jitter),
+        model_server=model_server.url if model_server else None,
+    )
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["EMBEDDING_PROVIDER"] = args.embedding_provider
+
+    # The legal corpus takes a minute to build, so its cache outlives the run's workdir
+    os.environ.setdefault("CORPUS_CACHE_DIR", str(REPO_ROOT / "benchmarks" / "results" / "corpus_cache"))
+    if args.web_only:
+        os.environ["LEGAL_CORPUS_DIR"] = tempfile.mkdtemp(prefix="no-corpus-")
+
+    # Uploads, caches and the vector store are written relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    os.chdir(workdir)
+
+    endpoints = {}
+    llm_gateway = {}
+    for name in apps:
+        selected = [e for e in ENDPOINTS[name] if not wanted or e in wanted]
+        if not selected:
+            continue
+        if name == "docqa":
+            endpoints.update(asyncio.run(bench_docqa(import_docqa(), args, selected)))
+            llm_gateway[name] = gateway_stats("llm_gateway")
+        elif name == "chatbot":
+            endpoints.update(asyncio.run(bench_chatbot(import_chatbot(), args, selected)))
+            llm_gateway[name] = gateway_stats("app.services.llm_gateway")
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "batch_size": args.batch_size,
+            "embedding_provider": args.embedding_provider,
+            "fact_check_requests": args.fact_check_requests,
+            "latency": {
+                "llm_s": args.llm_latency,
+                "llm_jitter_s": args.llm_jitter,
+                "embedding_s": args.embedding_latency,
+                "embedding_per_item_s": args.embedding_per_item,
+                "http_s": args.http_latency,
+                "http_jitter_s": args.http_jitter,
+            },
+            "model_server": {
+                "enabled": args.model_server,
+                "error_rate": args.llm_error_rate,
+                "slow_rate": args.llm_slow_rate,
+                "slow_latency_s": args.llm_slow_latency,
+            },
+        },
+        "endpoints": endpoints,
+        "llm_gateway": llm_gateway,
+    }
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    for endpoint, stats in endpoints.items():
+        print(f"{endpoint:<20} {stats['throughput_rps']:>8.2f} req/s  p50 {stats['p50_ms']:>9.1f} ms  "
+              f"p95 {stats['p95_ms']:>9.1f} ms  p99 {stats['p99_ms']:>9.1f} ms  errors {stats['errors']}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()